@@ -0,0 +1,206 @@
+import argparse
+import json
+import math
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from importlib import import_module
+from typing import Callable, Dict, List, Optional
+
+from generators import generate
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(ROOT, "benchmark_baseline.json")
+
+
+@dataclass
+class Benchmark:
+    name: str
+    day: int
+    sizes: List[int]
+    run: Callable[[str], object]
+    # Maps the generator size onto the amount of work, e.g. the number of cells for a grid side
+    work: Callable[[int], int] = lambda size: size
+    generator_kwargs: Dict = field(default_factory=dict)
+    # Measures the work on the generated input instead, for inputs whose work doesn't follow the size steadily
+    input_work: Optional[Callable[[str], int]] = None
+
+
+def day(n: int):
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+    return import_module(f"day{n}.main")
+
+
+def run_day1(path: str):
+    return day(1).calc_n_larger_sliding(path, 3)
+
+
+def run_day2(path: str):
+    return day(2).move_aimed(path)
+
+
+def run_day3(path: str):
+    return day(3).calc_co2_oxy(path)
+
+
+def run_day4(path: str):
+    m = day(4)
+    return m.bingo_lose(*m.parse_input(path))
+
+
+def run_day5(path: str):
+    m = day(5)
+    return m.count_dangerous(m.draw_lines(*m.parse_input(path, allow_diagonal=True)), 2)
+
+
+def run_day9(path: str):
+    m = day(9)
+    data = m.parse_input(path)
+    return m.get_basins(data, m.local_minimum(data))
+
+
+def run_day12(path: str):
+    m = day(12)
+    return m.count_all_paths(m.parse_input(path), 1)
+
+
+def run_day14(path: str):
+    m = day(14)
+    return m.recursive_with_cache(*m.parse_input(path), 40)
+
+
+def run_day15(path: str):
+    m = day(15)
+    return m.dijkstra(m.parse_input(path), (0, 0))
+
+
+BENCHMARKS = [
+    Benchmark("day1_calc_n_larger_sliding", 1, [20000, 40000, 80000, 160000], run_day1),
+    Benchmark("day2_move_aimed", 2, [20000, 40000, 80000, 160000], run_day2),
+    Benchmark("day3_calc_co2_oxy", 3, [500, 1000, 2000, 4000], run_day3),
+    Benchmark("day4_bingo_lose", 4, [25, 50, 100, 200], run_day4),
+    Benchmark("day5_draw_lines", 5, [250, 500, 1000, 2000], run_day5),
+    Benchmark("day9_get_basins", 9, [25, 50, 100, 200], run_day9, work=lambda side: side * side),
+    # The number of paths of a random cave graph jumps around with its size, the solver's work is that number
+    Benchmark("day12_count_all_paths", 12, [8, 10, 12, 16], run_day12, input_work=run_day12),
+    Benchmark("day14_recursive_with_cache", 14, [1000, 2000, 4000, 8000], run_day14),
+    Benchmark("day15_dijkstra", 15, [10, 20, 40, 80], run_day15, work=lambda side: side * side),
+]
+
+
+def fit_exponent(work: List[int], values: List[float]) -> float:
+    # Least squares slope in log-log space: values ~ work ** exponent
+    xs = [math.log(w) for w in work]
+    ys = [math.log(max(v, 1e-9)) for v in values]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    num = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+    den = sum((x - mean_x) ** 2 for x in xs)
+    return num / den
+
+
+def measure(benchmark: Benchmark, directory: str, repeat: int) -> Dict:
+    paths = []
+    for size in benchmark.sizes:
+        path = os.path.join(directory, f"{benchmark.name}_{size}.txt")
+        generate(path, benchmark.day, size, **benchmark.generator_kwargs)
+        paths.append(path)
+
+    # Warm up imports and JIT compilation
+    benchmark.run(paths[0])
+
+    times = []
+    peaks = []
+    for path in paths:
+        best = math.inf
+        for _ in range(repeat):
+            start = time.perf_counter()
+            benchmark.run(path)
+            best = min(best, time.perf_counter() - start)
+        times.append(best)
+
+        # Separate run, tracemalloc slows down pure Python code too much to time it at the same time
+        tracemalloc.start()
+        benchmark.run(path)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peaks.append(peak)
+
+    if benchmark.input_work is not None:
+        work = [benchmark.input_work(path) for path in paths]
+    else:
+        work = [benchmark.work(s) for s in benchmark.sizes]
+    return {
+        "sizes": benchmark.sizes,
+        "work": work,
+        "times": times,
+        "peak_memory": peaks,
+        "time_exponent": fit_exponent(work, times),
+        "memory_exponent": fit_exponent(work, peaks),
+    }
+
+
+def load_baseline(path: str = BASELINE_PATH) -> Dict:
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(name: str, result: Dict, baseline: Optional[Dict], tolerance: float) -> List[str]:
+    if baseline is None:
+        return []
+
+    failures = []
+    for key in ("time_exponent", "memory_exponent"):
+        if result[key] > baseline[key] + tolerance:
+            failures.append(f"{name}: {key} went from {baseline[key]:.2f} to {result[key]:.2f}")
+    return failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Sweep synthetic input sizes and compare the scaling to a baseline")
+    parser.add_argument("names", nargs="*", help="Benchmarks to run, defaults to all")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tolerance", type=float, default=0.35,
+                        help="Allowed increase of the fitted time/memory exponents")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    # Cached results would only measure the cache lookup
+    os.environ["AOC_NO_CACHE"] = "1"
+    benchmarks = [b for b in BENCHMARKS if not args.names or b.name in args.names]
+    baseline = load_baseline(args.baseline)
+
+    results = {}
+    failures = []
+    with tempfile.TemporaryDirectory() as directory:
+        for benchmark in benchmarks:
+            result = measure(benchmark, directory, args.repeat)
+            results[benchmark.name] = result
+
+            reference = baseline.get(benchmark.name)
+            failures += compare(benchmark.name, result, reference, args.tolerance)
+            times = " ".join(f"{t * 1000:.1f}ms" for t in result["times"])
+            baseline_exponent = "-" if reference is None else f"n^{reference['time_exponent']:.2f}"
+            print(f"{benchmark.name}: time ~ n^{result['time_exponent']:.2f}, "
+                  f"memory ~ n^{result['memory_exponent']:.2f} (baseline time ~ {baseline_exponent}) [{times}]")
+
+    if args.update_baseline:
+        baseline.update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=2)
+        return 0
+
+    for failure in failures:
+        print(f"REGRESSION {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,175 @@
+import ast
+import functools
+import hashlib
+import inspect
+import os
+import pickle
+import sqlite3
+import time
+from typing import Any, Callable, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+CACHE_PATH = os.environ.get("AOC_CACHE_PATH", os.path.join(ROOT, ".cache", "results.sqlite"))
+MAX_BYTES = int(os.environ.get("AOC_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
+
+def cache_disabled() -> bool:
+    return os.environ.get("AOC_NO_CACHE", "") not in ("", "0")
+
+
+class ResultCache:
+    def __init__(self, path: str = CACHE_PATH, max_bytes: int = MAX_BYTES):
+        self.path = path
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Workers of the runner share the file, so wait on locks instead of failing
+        self._connection = sqlite3.connect(path, timeout=30)
+        self._connection.execute("CREATE TABLE IF NOT EXISTS results "
+                                 "(key TEXT PRIMARY KEY, value BLOB, size INTEGER, last_access REAL)")
+        self._connection.commit()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        row = self._connection.execute("SELECT value FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return False, None
+
+        with self._connection:
+            self._connection.execute("UPDATE results SET last_access = ? WHERE key = ?", (time.time(), key))
+        return True, pickle.loads(row[0])
+
+    def put(self, key: str, value: Any):
+        blob = pickle.dumps(value)
+        if len(blob) > self.max_bytes:
+            return
+
+        with self._connection:
+            self._connection.execute("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                                     (key, blob, len(blob), time.time()))
+            self._evict()
+
+    def _evict(self):
+        total, = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM results").fetchone()
+        if total <= self.max_bytes:
+            return
+
+        # Least recently used first
+        for key, size in self._connection.execute("SELECT key, size FROM results ORDER BY last_access").fetchall():
+            self._connection.execute("DELETE FROM results WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def clear(self):
+        with self._connection:
+            self._connection.execute("DELETE FROM results")
+
+    def __len__(self):
+        return self._connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+
+_cache: Optional[ResultCache] = None
+
+
+def get_cache() -> ResultCache:
+    global _cache
+    if _cache is None:
+        _cache = ResultCache()
+    return _cache
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def local_imports(path: str) -> List[str]:
+    # The modules of this repository that a file imports, e.g. util.py for `from util import load_digit_grid`
+    with open(path) as f:
+        tree = ast.parse(f.read())
+
+    names = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.level == 0 and node.module:
+            names.add(node.module)
+    paths = (os.path.join(ROOT, *name.split(".")) + ".py" for name in names)
+    return sorted(p for p in paths if os.path.isfile(p))
+
+
+@functools.lru_cache(maxsize=None)
+def code_version(path: str) -> str:
+    # Results are only reused by the code that computed them, so editing a solver, a helper in its module or a
+    # shared module it (indirectly) imports is a cache miss as well
+    seen = {path}
+    todo = [path]
+    while todo:
+        for imported in local_imports(todo.pop()):
+            if imported not in seen:
+                seen.add(imported)
+                todo.append(imported)
+
+    digest = hashlib.sha256()
+    for source in sorted(seen):
+        digest.update(f"{os.path.relpath(source, ROOT)}:{hash_file(source)}\n".encode())
+    return digest.hexdigest()
+
+
+def fingerprint(value: Any) -> str:
+    # Input files are keyed by their content, not by their name, so an edited input is a cache miss
+    if isinstance(value, str) and os.path.isfile(value):
+        return f"file:{hash_file(value)}"
+    if value is None or isinstance(value, (bool, int, float, str, bytes)):
+        return repr(value)
+    if isinstance(value, (list, tuple)):
+        return f"{type(value).__name__}({','.join(map(fingerprint, value))})"
+    if isinstance(value, dict):
+        return f"dict({','.join(f'{fingerprint(k)}:{fingerprint(v)}' for k, v in sorted(value.items()))})"
+    if hasattr(value, "tobytes") and hasattr(value, "dtype"):
+        return f"array({value.dtype},{value.shape},{hashlib.sha256(value.tobytes()).hexdigest()})"
+    raise TypeError(f"Can't use a {type(value).__name__} as part of a cache key")
+
+
+def cached(day: int, part: Optional[str] = None) -> Callable:
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+        name = part or func.__name__
+        source = inspect.getsourcefile(inspect.unwrap(func))
+
+        @functools.wraps(func)
+        def wrapper(*args, bypass_cache: bool = False, **kwargs):
+            if bypass_cache or cache_disabled():
+                return func(*args, **kwargs)
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = ",".join(f"{k}={fingerprint(v)}" for k, v in bound.arguments.items())
+            key = hashlib.sha256(f"day{day}:{name}:{code_version(source)}:{arguments}".encode()).hexdigest()
+
+            cache = get_cache()
+            hit, value = cache.get(key)
+            if hit:
+                return value
+
+            value = func(*args, **kwargs)
+            cache.put(key, value)
+            return value
+
+        return wrapper
+    return decorator
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Inspect or clear the result cache")
+    parser.add_argument("--clear", action="store_true")
+    args = parser.parse_args()
+
+    if args.clear:
+        get_cache().clear()
+    print(f"{len(get_cache())} cached results in {CACHE_PATH}")
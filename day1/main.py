@@ -1,65 +1,133 @@
-def calc_n_larger(path: str) -> int:
-    n_larger = 0
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
 
-    with open(path) as f:
-        prev = int(f.readline())
+import numpy as np
 
-        while val := f.readline():
-            val = int(val)
-            if prev < val:
-                n_larger += 1
-            prev = val
+from util import CHUNK_BYTES, Source, iter_chunks, iter_file_range, parse_ints, split_file
 
-    return n_larger
 
+def parse_depths(chunk: bytes) -> np.ndarray:
+    # Any whitespace separates values, so blank lines and \r\n line endings are skipped
+    return parse_ints(chunk)
 
-def calc_n_larger_sliding(path: str, size: int) -> int:
-    n_larger = 0
 
-    with open(path) as f:
-        window = []
-        for _ in range(size):
-            window.append(int(f.readline()))
+def count_chunks(chunks: Iterable[bytes], sizes: List[int]) -> Tuple[Dict[int, int], np.ndarray, np.ndarray]:
+    # Two windows of `size` share all but one value, so the later sum is larger exactly when
+    # depths[i + size] > depths[i]. The last max(sizes) depths are carried over into the next chunk, so the
+    # comparisons across chunk boundaries are counted as well. Also returns the first and last max(sizes) depths.
+    keep = max(sizes)
+    counts = dict.fromkeys(sizes, 0)
 
-        prev = sum(window)
+    head = carry = np.zeros(0, dtype=np.int64)
+    for chunk in chunks:
+        depths = np.concatenate((carry, parse_depths(chunk)))
+        for size in sizes:
+            # Only compare against values of this chunk, the carried ones were counted by the previous chunk
+            start = max(len(carry), size)
+            if start < len(depths):
+                counts[size] += int(np.count_nonzero(depths[start:] > depths[start - size: len(depths) - size]))
+        if len(head) < keep:
+            head = depths[:keep]
+        carry = depths[-keep:]
 
-        while line := f.readline():
-            line = int(line)
-            window.pop(0)
-            window.append(line)
+    return counts, head, carry
 
-            val = sum(window)
-            if prev < val:
-                n_larger += 1
 
-            prev = val
+def count_increases(source: Source, sizes: Iterable[int], chunk_bytes: int = CHUNK_BYTES) -> Dict[int, int]:
+    return count_chunks(iter_chunks(source, chunk_bytes), sorted(set(sizes)))[0]
 
-    return n_larger
 
+def count_range(path: str, start: int, end: int, sizes: List[int], chunk_bytes: int) \
+        -> Tuple[Dict[int, int], np.ndarray, np.ndarray]:
+    return count_chunks(iter_file_range(path, start, end, chunk_bytes), sizes)
 
-def test_part_1():
-    n = calc_n_larger("./data/example.txt")
+
+def count_increases_parallel(path: str, sizes: Iterable[int], workers: Optional[int] = None,
+                             chunk_bytes: int = CHUNK_BYTES) -> Dict[int, int]:
+    # Every worker counts the comparisons within its own line aligned part of the file. Those that cross a
+    # boundary are fixed up here, from the last depths before the part and the first depths of the part.
+    sizes = sorted(set(sizes))
+    keep = max(sizes)
+    workers = workers or os.cpu_count()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(count_range, path, start, end, sizes, chunk_bytes)
+                   for start, end in split_file(path, workers)]
+
+        counts = dict.fromkeys(sizes, 0)
+        tail = np.zeros(0, dtype=np.int64)
+        for future in futures:
+            part_counts, head, part_tail = future.result()
+            depths = np.concatenate((tail, head))
+            for size in sizes:
+                counts[size] += part_counts[size]
+                start, end = max(len(tail), size), len(tail) + min(size, len(head))
+                if start < end:
+                    counts[size] += int(np.count_nonzero(depths[start:end] > depths[start - size: end - size]))
+            tail = np.concatenate((tail, part_tail))[-keep:]
+
+    return counts
+
+
+def calc_n_larger(source: Source) -> int:
+    return count_increases(source, [1])[1]
+
+
+def calc_n_larger_sliding(source: Source, size: int) -> int:
+    return count_increases(source, [size])[size]
+
+
+def test_part_1(data_dir: str = "./data"):
+    n = calc_n_larger(f"{data_dir}/example.txt")
     correct = 7
     assert correct == n, f"{correct} != {n}"
 
+    # The blank lines end up in a chunk of their own, which holds no depths (not a depth of 0)
+    counts = count_increases(["200\n", "\n", "\n", "100\n"], [1], chunk_bytes=1)
+    correct = {1: 0}
+    assert correct == counts, f"{correct} != {counts}"
+
 
-def part_1():
+def part_1(data_dir: str = "./data"):
     print("Solution part 1:")
-    print(calc_n_larger("./data/input.txt"))
+    print(calc_n_larger(f"{data_dir}/input.txt"))
 
 
-def test_part_2():
-    n = calc_n_larger_sliding("./data/example.txt", size=3)
+def test_part_2(data_dir: str = "./data"):
+    n = calc_n_larger_sliding(f"{data_dir}/example.txt", size=3)
     correct = 5
     assert correct == n, f"{correct} != {n}"
 
+    # Tiny chunks, so nearly every comparison crosses a chunk boundary
+    counts = count_increases(f"{data_dir}/example.txt", [1, 3, 20], chunk_bytes=8)
+    correct = {1: 7, 3: 5, 20: 0}
+    assert correct == counts, f"{correct} != {counts}"
 
-def part_2():
+    # More workers than lines, so some parts are empty and some windows span several parts
+    counts = count_increases_parallel(f"{data_dir}/example.txt", [1, 3, 20], workers=16, chunk_bytes=8)
+    assert correct == counts, f"{correct} != {counts}"
+
+
+def part_2(data_dir: str = "./data"):
     print("Solutin part 2:")
-    print(calc_n_larger_sliding("./data/input.txt", size=3))
+    print(calc_n_larger_sliding(f"{data_dir}/input.txt", size=3))
 
 
 if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        # e.g. zcat depths.gz | python main.py - 1 3 10, or AOC_WORKERS=32 python main.py depths.txt 1 3 10
+        sizes = [int(size) for size in sys.argv[2:]] or [1]
+        workers = int(os.environ.get("AOC_WORKERS", 1))
+        if workers > 1 and sys.argv[1] != "-":
+            counts = count_increases_parallel(sys.argv[1], sizes, workers)
+        else:
+            counts = count_increases(sys.argv[1], sizes)
+        for size, count in counts.items():
+            print(f"{size}: {count}")
+        sys.exit()
+
     test_part_1()
     part_1()
 
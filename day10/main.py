@@ -1,10 +1,13 @@
-from typing import List, Iterable, Tuple
-import pyparsing
-from pyparsing import ZeroOrMore, Forward, Literal, OneOrMore, Optional, ParserElement
-from tqdm import tqdm
+import sys
+from typing import List, Iterable, Tuple, Iterator
 
+from instrument import instrument
+from lazy import lazy_import
+from util import Source, iter_lines
 
-pyparsing.ParserElement.enablePackrat()
+# Only loaded once a parser is built
+pyparsing = lazy_import("pyparsing")
+tqdm = lazy_import("tqdm")
 
 
 class BracketMismatchException(Exception):
@@ -30,19 +33,21 @@ class Part_One_Parser:
     }
 
     def __init__(self):
+        pyparsing.ParserElement.enablePackrat()
+
         self.missing_brackets = []
         opener = self._xor_literals(self.match_bracket.keys())
         closer = self._xor_literals(self.match_bracket.values())
 
-        closed_expr = Forward()
-        opened_expr = Forward()
+        closed_expr = pyparsing.Forward()
+        opened_expr = pyparsing.Forward()
 
-        closed_expr <<= (opener + ZeroOrMore(closed_expr) + closer).set_parse_action(self._check_match)
-        opened_expr <<= (opener ^ opener + ZeroOrMore(closed_expr ^ opened_expr)).set_parse_action(
+        closed_expr <<= (opener + pyparsing.ZeroOrMore(closed_expr) + closer).set_parse_action(self._check_match)
+        opened_expr <<= (opener ^ opener + pyparsing.ZeroOrMore(closed_expr ^ opened_expr)).set_parse_action(
             lambda s, loc, toks: self._store_missing(s, loc, toks)
         )
 
-        self.expr = opened_expr ^ (OneOrMore(closed_expr) + Optional(opened_expr))
+        self.expr = opened_expr ^ (pyparsing.OneOrMore(closed_expr) + pyparsing.Optional(opened_expr))
 
     @staticmethod
     def _check_match(s, loc, toks):
@@ -55,15 +60,17 @@ class Part_One_Parser:
     @staticmethod
     def _xor_literals(iterable: Iterable[str]):
         iterator = iterable.__iter__()
-        result = Literal(next(iterator))
+        result = pyparsing.Literal(next(iterator))
         for i in iterator:
-            result ^= Literal(i)
+            result ^= pyparsing.Literal(i)
         return result
 
-    def parse(self, string: str) -> ParserElement:
+    @instrument
+    def parse(self, string: str) -> "pyparsing.ParserElement":
         return self.expr.parse_string(string, parse_all=True)
 
-    def parse_get_missing(self, string: str) -> Tuple[ParserElement, List[str]]:
+    @instrument
+    def parse_get_missing(self, string: str) -> Tuple["pyparsing.ParserElement", List[str]]:
         self.missing_brackets = []
         return self.expr.parse_string(string, parse_all=True), self.missing_brackets
 
@@ -92,10 +99,10 @@ def get_completion_points(missing: List[str]) -> int:
     return score
 
 
-def get_parse_score(lines: List[str]):
+def get_parse_score(lines: Iterable[str]):
     parser = Part_One_Parser()
     score = 0
-    for line in tqdm(lines):
+    for line in tqdm.tqdm(lines):
         try:
             parser.parse(line)
         except BracketMismatchException as e:
@@ -104,33 +111,32 @@ def get_parse_score(lines: List[str]):
     return score
 
 
-def parse_input(path: str) -> List[str]:
-    lines = []
-    with open(path) as f:
-        while line := f.readline():
-            lines.append(line.strip())
-    return lines
+def parse_input(source: Source) -> Iterator[str]:
+    # Lazily, so the scores are computed while the input is being read
+    for line in iter_lines(source):
+        if line := line.strip():
+            yield line
 
 
-def test_part_1():
-    lines = parse_input("./data/example.txt")
+def test_part_1(data_dir: str = "./data"):
+    lines = parse_input(f"{data_dir}/example.txt")
     solution = get_parse_score(lines)
     correct = 26397
     assert correct == solution, f"{correct} != {solution}"
 
 
-def part_1():
-    lines = parse_input("./data/input.txt")
+def part_1(data_dir: str = "./data"):
+    lines = parse_input(f"{data_dir}/input.txt")
     solution = get_parse_score(lines)
 
     print("Solution part 1:")
     print(solution)
 
 
-def get_completion_score(lines: List[str]) -> int:
+def get_completion_score(lines: Iterable[str]) -> int:
     parser = Part_One_Parser()
     scores = []
-    for line in tqdm(lines):
+    for line in tqdm.tqdm(lines):
         try:
             _, missing = parser.parse_get_missing(line)
             scores.append(get_completion_points(missing))
@@ -141,15 +147,15 @@ def get_completion_score(lines: List[str]) -> int:
     return scores[len(scores) // 2]
 
 
-def test_part_2():
-    lines = parse_input("./data/example.txt")
+def test_part_2(data_dir: str = "./data"):
+    lines = parse_input(f"{data_dir}/example.txt")
     solution = get_completion_score(lines)
     correct = 288957
     assert correct == solution, f"{correct} != {solution}"
 
 
-def part_2():
-    lines = parse_input("./data/input.txt")
+def part_2(data_dir: str = "./data"):
+    lines = parse_input(f"{data_dir}/input.txt")
     solution = get_completion_score(lines)
 
     print("Solution part 2:")
@@ -157,6 +163,12 @@ def part_2():
 
 
 if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        # e.g. zcat navigation.gz | python main.py - completion
+        lines = parse_input(sys.argv[1])
+        print(get_completion_score(lines) if sys.argv[2:] == ["completion"] else get_parse_score(lines))
+        sys.exit()
+
     test_part_1()
     part_1()
     print()
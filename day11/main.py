@@ -1,5 +1,7 @@
 from typing import List, Union
 
+from util import load_digit_grid, grid_neighbours
+
 
 class Octopus:
     def __init__(self, starting_energy: Union[int, str]):
@@ -37,34 +39,12 @@ class Cave:
                 self._octopusses[-1].append(Octopus(val))
                 self.n_octopuses += 1
 
-        for y, row in enumerate(self._octopusses):
-            for x, octopus in enumerate(row):
-                neighbours = []
-                t = y > 0
-                l = x > 0
-                r = x < len(row) - 1
-                b = y < len(grid) - 1
-                if t:
-                    neighbours.append(self._octopusses[y - 1][x])
-                    if l:
-                        neighbours.append(self._octopusses[y - 1][x - 1])
-                    if r:
-                        neighbours.append(self._octopusses[y - 1][x + 1])
-    
-                if l:
-                    neighbours.append(self._octopusses[y][x - 1])
-                if r:
-                    neighbours.append(self._octopusses[y][x + 1])
-    
-                if b:
-                    neighbours.append(self._octopusses[y + 1][x])
-                    if l:
-                        neighbours.append(self._octopusses[y + 1][x - 1])
-                    if r:
-                        neighbours.append(self._octopusses[y + 1][x + 1])
-    
-                for neighbour in neighbours:
-                    octopus.add_neighbour(neighbour)
+        flat = [octopus for row in self._octopusses for octopus in row]
+        indptr, indices = grid_neighbours((len(self._octopusses), len(self._octopusses[0])), 8)
+        indptr, indices = indptr.tolist(), indices.tolist()
+        for i, octopus in enumerate(flat):
+            for neighbour in indices[indptr[i]:indptr[i + 1]]:
+                octopus.add_neighbour(flat[neighbour])
 
     def __iter__(self):
         for row in self._octopusses:
@@ -90,16 +70,11 @@ class Cave:
 
 
 def parse_input(path: str) -> Cave:
-    lines = []
-    with open(path) as f:
-        while line := f.readline():
-            lines.append(list(map(int, list(line.strip()))))
-
-    return Cave(lines)
+    return Cave(load_digit_grid(path).tolist())
 
 
-def test_part_1():
-    cave = parse_input("./data/example.txt")
+def test_part_1(data_dir: str = "./data"):
+    cave = parse_input(f"{data_dir}/example.txt")
     for _ in range(10):
         cave.update()
 
@@ -115,8 +90,8 @@ def test_part_1():
     assert correct == solution, f"{correct} != {solution}"
 
 
-def part_1():
-    cave = parse_input("./data/input.txt")
+def part_1(data_dir: str = "./data"):
+    cave = parse_input(f"{data_dir}/input.txt")
     for _ in range(100):
         cave.update()
 
@@ -124,8 +99,8 @@ def part_1():
     print(cave.flashes)
 
 
-def test_part_2():
-    cave = parse_input("./data/example.txt")
+def test_part_2(data_dir: str = "./data"):
+    cave = parse_input(f"{data_dir}/example.txt")
 
     while cave.update() != cave.n_octopuses:
         cave.update()
@@ -135,8 +110,8 @@ def test_part_2():
     assert correct == solution, f"{correct} != {solution}"
 
 
-def part_2():
-    cave = parse_input("./data/input.txt")
+def part_2(data_dir: str = "./data"):
+    cave = parse_input(f"{data_dir}/input.txt")
 
     while cave.update() != cave.n_octopuses:
         cave.update()
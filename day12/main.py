@@ -1,5 +1,8 @@
 from typing import Dict, Set
 
+from cache import cached
+from instrument import instrument
+
 
 class Cave:
     def __init__(self, name: str):
@@ -33,6 +36,7 @@ def parse_input(path: str) -> Dict[str, Cave]:
 
 
 def count_all_paths(caves: Dict[str, Cave], small_cave_visits: int = 0):
+    @instrument(name="depth_first_search_count")
     def depth_first_search_count(current: Cave, destination: Cave, visited: Dict[Cave, bool],
                                  remaining_small_visists: int, is_extra_visit: bool = False):
         visited[current] = True
@@ -56,42 +60,47 @@ def count_all_paths(caves: Dict[str, Cave], small_cave_visits: int = 0):
     return depth_first_search_count(caves["start"], caves["end"], {c: False for c in caves.values()}, small_cave_visits)
 
 
-def test_part_1():
-    solution_small = count_all_paths(parse_input("./data/example_small.txt"))
+@cached(12)
+def count_all_paths_in_file(path: str, small_cave_visits: int = 0) -> int:
+    return count_all_paths(parse_input(path), small_cave_visits)
+
+
+def test_part_1(data_dir: str = "./data"):
+    solution_small = count_all_paths_in_file(f"{data_dir}/example_small.txt", bypass_cache=True)
     correct_small = 10
     assert correct_small == solution_small, f"{correct_small} != {solution_small}"
 
-    solution_medium = count_all_paths(parse_input("./data/example_medium.txt"))
+    solution_medium = count_all_paths_in_file(f"{data_dir}/example_medium.txt", bypass_cache=True)
     correct_medium = 19
     assert correct_medium == solution_medium, f"{correct_medium} != {solution_medium}"
 
-    solution_large = count_all_paths(parse_input("./data/example_large.txt"))
+    solution_large = count_all_paths_in_file(f"{data_dir}/example_large.txt", bypass_cache=True)
     correct_large = 226
     assert correct_large == solution_large, f"{correct_large} != {solution_large}"
 
 
-def part_1():
-    solution = count_all_paths(parse_input("./data/input.txt"))
+def part_1(data_dir: str = "./data"):
+    solution = count_all_paths_in_file(f"{data_dir}/input.txt")
     print("Solution part 1:")
     print(solution)
 
 
-def test_part_2():
-    solution_small = count_all_paths(parse_input("./data/example_small.txt"), 1)
+def test_part_2(data_dir: str = "./data"):
+    solution_small = count_all_paths_in_file(f"{data_dir}/example_small.txt", 1, bypass_cache=True)
     correct_small = 36
     assert correct_small == solution_small, f"{correct_small} != {solution_small}"
     
-    solution_medium = count_all_paths(parse_input("./data/example_medium.txt"), 1)
+    solution_medium = count_all_paths_in_file(f"{data_dir}/example_medium.txt", 1, bypass_cache=True)
     correct_medium = 103
     assert correct_medium == solution_medium, f"{correct_medium} != {solution_medium}"
 
-    solution_large = count_all_paths(parse_input("./data/example_large.txt"), 1)
+    solution_large = count_all_paths_in_file(f"{data_dir}/example_large.txt", 1, bypass_cache=True)
     correct_large = 3509
     assert correct_large == solution_large, f"{correct_large} != {solution_large}"
 
 
-def part_2():
-    solution = count_all_paths(parse_input("./data/input.txt"), 1)
+def part_2(data_dir: str = "./data"):
+    solution = count_all_paths_in_file(f"{data_dir}/input.txt", 1)
     print("Solution part 2:")
     print(solution)
 
@@ -3,6 +3,8 @@ from typing import Tuple, List
 
 import numpy as np
 
+from util import render
+
 
 def parse_input(path: str) -> Tuple[List[Tuple[int, int]], List[Tuple[int, int]]]:
     with open(path) as f:
@@ -41,10 +43,8 @@ def coords_to_array(coords: List[Tuple[int, int]]):
 
 
 def print_array(arr: np.ndarray):
-    for row in arr:
-        for val in row:
-            print("#" if val else ".", end="")
-        print()
+    # The folded paper is the answer of part 2, so it is always printed and never downsampled
+    render(np.where(arr, "#", "."), max_shape=arr.shape)
 
 
 def do_fold(arr: np.ndarray, position: int, axis: int) -> np.ndarray:
@@ -74,8 +74,8 @@ def do_fold(arr: np.ndarray, position: int, axis: int) -> np.ndarray:
         return l + r
 
 
-def test_part_1():
-    coords, folds = parse_input("./data/example.txt")
+def test_part_1(data_dir: str = "./data"):
+    coords, folds = parse_input(f"{data_dir}/example.txt")
     arr = coords_to_array(coords)
     axis, position = folds[0]
     arr = do_fold(arr, position, axis)
@@ -85,8 +85,8 @@ def test_part_1():
     assert correct == solution, f"{correct} != {solution}"
 
 
-def part_1():
-    coords, folds = parse_input("./data/input.txt")
+def part_1(data_dir: str = "./data"):
+    coords, folds = parse_input(f"{data_dir}/input.txt")
     arr = coords_to_array(coords)
     axis, position = folds[0]
     arr = do_fold(arr, position, axis)
@@ -96,8 +96,8 @@ def part_1():
     print(solution)
 
 
-def part_2():
-    coords, folds = parse_input("./data/input.txt")
+def part_2(data_dir: str = "./data"):
+    coords, folds = parse_input(f"{data_dir}/input.txt")
     arr = coords_to_array(coords)
 
     for axis, position in folds:
@@ -27,9 +27,9 @@ def do_step(polymer: str, insertion_rules: Dict[str, str]) -> str:
     return new_polymer
 
 
-def test_part_1():
+def test_part_1(data_dir: str = "./data"):
     # Using a naive approach
-    pol, rules = parse_input("./data/example.txt")
+    pol, rules = parse_input(f"{data_dir}/example.txt")
     for _ in range(10):
         pol = do_step(pol, rules)
 
@@ -42,8 +42,8 @@ def test_part_1():
     assert correct == solution, f"{correct} != {solution}"
 
 
-def part_1():
-    pol, rules = parse_input("./data/input.txt")
+def part_1(data_dir: str = "./data"):
+    pol, rules = parse_input(f"{data_dir}/input.txt")
     for _ in range(10):
         pol = do_step(pol, rules)
 
@@ -79,9 +79,9 @@ def recursive_with_cache(pol: str, rules: Dict[str, str], n_iterations: int) ->
     return result
 
 
-def test_part_2():
+def test_part_2(data_dir: str = "./data"):
     # Using an optimized approach
-    pol, rules = parse_input("./data/example.txt")
+    pol, rules = parse_input(f"{data_dir}/example.txt")
 
     counter = recursive_with_cache(pol, rules, 40)
     mc = counter.most_common()
@@ -93,8 +93,8 @@ def test_part_2():
     assert correct == solution, f"{correct} != {solution}"
 
 
-def part_2():
-    pol, rules = parse_input("./data/input.txt")
+def part_2(data_dir: str = "./data"):
+    pol, rules = parse_input(f"{data_dir}/input.txt")
 
     c = recursive_with_cache(pol, rules, 40)
 
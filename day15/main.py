@@ -1,116 +1,107 @@
 from typing import Tuple
 
 import numpy as np
-import numba as nb
 
+from cache import cached
+from instrument import instrument
+from lazy import lazy_njit
+from util import load_digit_grid, grid_neighbours
 
-def parse_input(path: str) -> np.ndarray:
-    data = []
-    with open(path) as f:
-        while line := f.readline():
-            data.append(list(map(int, list(line.strip()))))
-
-    return np.array(data)
-
-
-@nb.jit(nb.int32[:, :](nb.int32[:, :], nb.int32, nb.int32), nopython=True)
-def get_neighbours(data: np.ndarray, row: int, column: int) -> np.ndarray:
-    neighbours = []
 
-    if row > 0:
-        neighbours.append([row - 1, column])
-    if row < data.shape[0] - 1:
-        neighbours.append([row + 1, column])
-    if column > 0:
-        neighbours.append([row, column - 1])
-    if column < data.shape[1] - 1:
-        neighbours.append([row, column + 1])
-
-    return np.array(neighbours, dtype=np.int32)
+def parse_input(path: str) -> np.ndarray:
+    return load_digit_grid(path, dtype=np.int32)
 
 
-@nb.jit(nb.int64[:, :](nb.int32[:, :], nb.types.UniTuple(nb.int64, 2)), nopython=True)
-def dijkstra(data: np.ndarray, source: Tuple[int, int]) -> Tuple[np.ndarray, np.ndarray]:
+# Numba is imported and the kernel compiled on first use, the compiled kernel is cached on disk (__pycache__).
+# Run warmup.py to prebuild the cache.
+@lazy_njit(cache=True)
+def dijkstra_csr(weights: np.ndarray, source: int, indptr: np.ndarray, indices: np.ndarray) -> np.ndarray:
+    # Works on flat cell indices, the neighbours of cell i are indices[indptr[i]:indptr[i + 1]]
     def argmin(iterable):
         mn = 9999999999
-        mn_ind = None
+        mn_ind = -1
         for idx, val in iterable.items():
             if val < mn:
                 mn = val
                 mn_ind = idx
         return mn_ind
 
-    max_d = np.sum(data)
-    distances = np.ones(data.shape, dtype=np.int32) * max_d
+    max_d = np.sum(weights)
+    distances = np.ones(weights.size, dtype=np.int64) * max_d
 
-    distances[source[0], source[1]] = 0
+    distances[source] = 0
 
     prio_queue = dict()
 
-    # noinspection PyTypeChecker
-    for y, x in np.ndindex(data.shape):
-        prio_queue[(y, x)] = distances[y, x]
+    for i in range(weights.size):
+        prio_queue[i] = distances[i]
 
     while prio_queue:
-        Uy, Ux = argmin(prio_queue)
-        U = prio_queue.pop((Uy, Ux))
-        for ny, nx in get_neighbours(data, Uy, Ux):
-            temp_distance = distances[Uy, Ux] + data[ny, nx]
-            if temp_distance < distances[ny, nx]:
-                distances[ny, nx] = temp_distance
-                prio_queue[(ny, nx)] = temp_distance
+        u = argmin(prio_queue)
+        prio_queue.pop(u)
+        for k in range(indptr[u], indptr[u + 1]):
+            n = indices[k]
+            temp_distance = distances[u] + weights[n]
+            if temp_distance < distances[n]:
+                distances[n] = temp_distance
+                prio_queue[n] = temp_distance
 
     return distances
 
 
-def test_part_1():
-    data = parse_input("./data/example.txt")
-    d = dijkstra(data, (0, 0))
+@instrument
+def dijkstra(data: np.ndarray, source: Tuple[int, int]) -> np.ndarray:
+    indptr, indices = grid_neighbours(data.shape, 4)
+    distances = dijkstra_csr(np.ascontiguousarray(data).ravel(), source[0] * data.shape[1] + source[1], indptr,
+                             indices)
+    return distances.reshape(data.shape)
 
-    solution = d[data.shape[0] - 1, data.shape[1] - 1]
-    correct = 40
-    assert correct == solution, f"{correct} != {solution}"
 
+def warm_up():
+    # Same argument types as lowest_total_risk, so these are the specializations that get cached
+    dijkstra(np.ones((2, 2), dtype=np.int32), (0, 0))
 
-def part_1():
-    data = parse_input("./data/input.txt")
-    d = dijkstra(data, (0, 0))
 
-    solution = d[data.shape[0] - 1, data.shape[1] - 1]
-    print("Solution part 1:")
-    print(solution)
-
-
-def test_part_2():
-    data = parse_input("./data/example.txt")
+def tile(data: np.ndarray, n: int) -> np.ndarray:
     tiled_data = np.copy(data)
-    for i in range(4):
+    for i in range(n - 1):
         tiled_data = np.concatenate((tiled_data, (data + i) % 9 + 1), axis=0)
 
     data = np.copy(tiled_data)
-    for i in range(4):
+    for i in range(n - 1):
         tiled_data = np.concatenate((tiled_data, (data + i) % 9 + 1), axis=1)
 
-    d = dijkstra(tiled_data, (0, 0))
+    return tiled_data
 
-    solution = d[tiled_data.shape[0] - 1, tiled_data.shape[1] - 1]
-    correct = 315
+
+@cached(15)
+@instrument
+def lowest_total_risk(path: str, tiles: int = 1) -> int:
+    data = tile(parse_input(path), tiles)
+    d = dijkstra(data, (0, 0))
+    return int(d[data.shape[0] - 1, data.shape[1] - 1])
+
+
+def test_part_1(data_dir: str = "./data"):
+    solution = lowest_total_risk(f"{data_dir}/example.txt", bypass_cache=True)
+    correct = 40
     assert correct == solution, f"{correct} != {solution}"
 
 
-def part_2():
-    data = parse_input("./data/input.txt")
-    tiled_data = np.copy(data)
-    for i in range(4):
-        tiled_data = np.concatenate((tiled_data, (data + i) % 9 + 1), axis=0)
+def part_1(data_dir: str = "./data"):
+    solution = lowest_total_risk(f"{data_dir}/input.txt")
+    print("Solution part 1:")
+    print(solution)
 
-    data = np.copy(tiled_data)
-    for i in range(4):
-        tiled_data = np.concatenate((tiled_data, (data + i) % 9 + 1), axis=1)
 
-    d = dijkstra(tiled_data, (0, 0))
+def test_part_2(data_dir: str = "./data"):
+    solution = lowest_total_risk(f"{data_dir}/example.txt", tiles=5, bypass_cache=True)
+    correct = 315
+    assert correct == solution, f"{correct} != {solution}"
+
 
-    solution = d[tiled_data.shape[0] - 1, tiled_data.shape[1] - 1]
+def part_2(data_dir: str = "./data"):
+    solution = lowest_total_risk(f"{data_dir}/input.txt", tiles=5)
     print("Solution part 2:")
     print(solution)
 
@@ -267,8 +267,8 @@ def test_part_one_example(hexa, expected_sum):
                                         f"got {version_sum} ({versions})"
 
 
-def part_1():
-    inp = parse_input(f"./data/input.txt")
+def part_1(data_dir: str = "./data"):
+    inp = parse_input(f"{data_dir}/input.txt")
     bits = hex_to_bin(inp)
     packet = PacketFactory.parse_single_packet(CountedStringIO(bits))
     solution = sum([p.version for p in packet])
@@ -283,8 +283,8 @@ def test_part_two_example(hexa, expected_result):
                                             f"got {packet.value} ({packet})"
 
 
-def part_2():
-    inp = parse_input(f"./data/input.txt")
+def part_2(data_dir: str = "./data"):
+    inp = parse_input(f"{data_dir}/input.txt")
     bits = hex_to_bin(inp)
     packet = PacketFactory.parse_single_packet(CountedStringIO(bits))
     solution = packet.value
@@ -1,14 +1,14 @@
-import itertools
 import math
 import re
-import time
-import timeit
-from contextlib import redirect_stderr
 from typing import Tuple, List
 
-import numba as nb
 import numpy as np
-import joblib
+
+from cache import cached
+from lazy import lazy_import, lazy_njit
+from util import render, rendering_enabled
+
+joblib = lazy_import("joblib")
 
 np.set_printoptions(edgeitems=30, linewidth=100000)
 
@@ -20,45 +20,33 @@ def parse_input(path: str) -> Tuple[int, int, int, int]:
     return int(x_min), int(x_max), int(y_min), int(y_max)
 
 
-@nb.jit(nb.int64(nb.int64), nopython=True)
+# Numba is imported and the kernels compiled on first use, compiled kernels are cached on disk (__pycache__).
+# Run warmup.py to prebuild the cache.
+@lazy_njit(cache=True)
 def cumsum(n: int) -> int:
     return int(n * (n + 1) / 2)
 
 
-@nb.jit(nb.float64(nb.int64), nopython=True)
+@lazy_njit(cache=True)
 def cumsum_inverse(n: int) -> float:
     return 0.5 * (math.sqrt(8 * n + 1) - 1)
 
 
-@nb.njit
+@lazy_njit(cache=True)
 def change_velocity(vx, vy):
     return vx - 1 if vx > 0 else vx + 1 if vx < 0 else vx, vy - 1
 
 
 def plot_trajectory(vx, vy, x_min, x_max, y_min, y_max):
-    def print_array(data):
-        print(data)
-        for row in data:
-            for v in row:
-                if v == 0:
-                    c = "."
-                elif v == 1:
-                    c = "T"
-                elif v == 2 or v == 4:
-                    c = "#"
-                elif v == 3:
-                    c = "X"
-                else:
-                    raise NotImplementedError(str(v))
-                print(c, end="")
-            print()
-            # print("".join(["." if v == 0 else "#" if v == 1 else "T" for v in row.tolist()]))
+    if not rendering_enabled():
+        return
 
     arr, _ = calc_trajectory_target_array(vx, vy, x_min, x_max, y_min, y_max)
-    print_array(arr)
+    # 0: empty, 1: target, 2: trajectory, 3: trajectory inside the target, 4: trajectory passing a cell twice
+    render(np.array(list(".T#X#"))[arr])
 
 
-@nb.njit
+@lazy_njit(cache=True)
 def calc_trajectory_target_array(vx: int, vy: int, x_min: int, x_max: int, y_min: int, y_max: int)\
         -> Tuple[np.ndarray, int]:
     xs, ys = get_trajectory_steps(vx, vy, x_max, y_min)
@@ -72,7 +60,7 @@ def calc_trajectory_target_array(vx: int, vy: int, x_min: int, x_max: int, y_min
     return arr, y_offset
 
 
-@nb.njit
+@lazy_njit(cache=True)
 def get_trajectory_steps(vx: int, vy: int, x_max: int, y_min: int) -> Tuple[List[int], List[int]]:
     x_pos = 0
     y_pos = 0
@@ -114,7 +102,7 @@ def get_vys_brute_force(y_min, y_max, upper_bound=100000):
     return ys
 
 
-@nb.njit
+@lazy_njit(cache=True)
 def get_max_vy(y_min, y_max, upper_bound=100000):
     last_hit_vy = None
     for vy in range(upper_bound):
@@ -123,18 +111,18 @@ def get_max_vy(y_min, y_max, upper_bound=100000):
     return last_hit_vy
 
 
-@nb.njit
+@lazy_njit(cache=True)
 def get_max_height(vy):
     return cumsum(vy)
 
 
-@nb.njit
+@lazy_njit(cache=True)
 def hits_y(vy, y_min, y_max):
     max_height = cumsum(vy)
     return math.floor(cumsum_inverse(max_height - y_min)) >= cumsum_inverse(max_height - y_max)
 
 
-@nb.njit
+@lazy_njit(cache=True)
 def hits_x(vx, x_max, x_min):
     max_width = cumsum(vx)
     return max_width >= x_min and math.floor(cumsum_inverse(x_max)) >= cumsum_inverse(x_min)
@@ -145,8 +133,8 @@ def hits(vx, vy, x_min, x_max, y_min, y_max):
     return hits_x(vx, x_max, x_min) and hits_y(vy, y_min, y_max)
 
 
-def test_part_1():
-    target = parse_input("./data/example.txt")
+def test_part_1(data_dir: str = "./data"):
+    target = parse_input(f"{data_dir}/example.txt")
     vx = get_min_vx(target[0], target[1])
     vy = get_max_vy(target[2], target[3])
     # plot_trajectory(vx, vy, *target)
@@ -156,8 +144,8 @@ def test_part_1():
     assert correct == solution, f"{correct} != {solution}"
 
 
-def part_1():
-    target = parse_input("./data/input.txt")
+def part_1(data_dir: str = "./data"):
+    target = parse_input(f"{data_dir}/input.txt")
     vx = get_min_vx(target[0], target[1])
     vy = get_max_vy(target[2], target[3])
 
@@ -197,7 +185,7 @@ def brute_force_get_all_vs_joblib(target: Tuple[int, int, int, int]) -> int:
     return sum(result)
 
 
-@nb.jit(nb.int64(nb.int64, nb.int64, nb.int64, nb.int64), nopython=True)
+@lazy_njit(cache=True)
 def brute_force_get_all_vs_numba(x_min: int, x_max: int, y_min: int, y_max: int) -> int:
     min_vx = int(np.ceil(cumsum_inverse(x_min)))
     max_vx = cumsum(x_max)
@@ -205,9 +193,9 @@ def brute_force_get_all_vs_numba(x_min: int, x_max: int, y_min: int, y_max: int)
     max_vy = get_max_vy(y_min, y_max)
 
     total = 0
-    for vx in nb.prange(min_vx, max_vx):
+    for vx in range(min_vx, max_vx):
         inner_sum = 0
-        for vy in nb.prange(min_vy, max_vy + 1):
+        for vy in range(min_vy, max_vy + 1):
             arr, y_offset = calc_trajectory_target_array(vx, vy, x_min, x_max, y_min, y_max)
             target_arr = arr[-y_max + y_offset: -y_min + y_offset + 1, x_min: x_max + 1]
             if np.any(target_arr == 3):
@@ -217,18 +205,32 @@ def brute_force_get_all_vs_numba(x_min: int, x_max: int, y_min: int, y_max: int)
     return total
 
 
-def test_part_2():
-    target = parse_input("./data/example.txt")
-    solution = brute_force_get_all_vs_numba(*target)
+def warm_up():
+    # Compiles every kernel part 1 and part 2 call from Python, with the argument types they are called with
+    target = (20, 30, -10, -5)
+    get_min_vx(target[0], target[1])
+    vy = get_max_vy(target[2], target[3])
+    get_max_height(vy)
+    calc_trajectory_target_array(6, vy, *target)
+    get_vxs(target[0], target[1])
+    brute_force_get_all_vs_numba(*target)
+
+
+@cached(17)
+def count_all_velocities(path: str) -> int:
+    # Both brute force methods are extremely inefficient, but they work...
+    return brute_force_get_all_vs_numba(*parse_input(path))
+
+
+def test_part_2(data_dir: str = "./data"):
+    solution = count_all_velocities(f"{data_dir}/example.txt", bypass_cache=True)
 
     correct = 112
     assert correct == solution, f"{correct} != {solution}"
 
 
-def part_2():
-    target = parse_input("./data/input.txt")
-    # Both brute force methods are extremely inefficient, but they work...
-    solution = brute_force_get_all_vs_numba(*target)
+def part_2(data_dir: str = "./data"):
+    solution = count_all_velocities(f"{data_dir}/input.txt")
 
     print("Solution part 2:")
     print(solution)
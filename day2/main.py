@@ -1,71 +1,238 @@
-from typing import Tuple
+import hashlib
+import json
+import os
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple, Union
 
+import numpy as np
 
-def parse_line(line: str) -> Tuple[str, int]:
-    direction, count = line.split()
-    return direction, int(count)
+from util import CHUNK_BYTES, Source, iter_chunks, iter_file_range, parse_ints, split_file
 
 
-def move(path) -> Tuple[int, int]:
+FORWARD, DOWN, UP = b"fdu"
+# Bytes before the checkpointed offset that must be unchanged to resume from a checkpoint
+CHECKPOINT_CONTEXT = 4096
+
+
+def parse_commands(chunk: bytes) -> Tuple[np.ndarray, np.ndarray]:
+    # The first byte of every line is enough to tell the directions apart, the rest of the word is deleted so
+    # only the counts are left for parse_ints
+    buffer = np.frombuffer(chunk, dtype=np.uint8)
+    starts = np.flatnonzero(buffer == ord("\n")) + 1
+    starts = np.concatenate(([0], starts[starts < len(buffer)]))
+    codes = buffer[starts]
+    codes = codes[np.isin(codes, (FORWARD, DOWN, UP))]
+
+    counts = parse_ints(chunk.translate(None, b"forwardupn"))
+    if len(codes) != len(counts):
+        raise ValueError("Every command must be a direction followed by a count")
+    return codes, counts
+
+
+def iter_commands(source: Source, chunk_bytes: int = CHUNK_BYTES) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    for chunk in iter_chunks(source, chunk_bytes):
+        yield parse_commands(chunk)
+
+
+def move(source: Source, trajectory=False, chunk_bytes: int = CHUNK_BYTES) \
+        -> Union[Tuple[int, int], Tuple[np.ndarray, np.ndarray]]:
+    # With trajectory, the horizontal position and depth after every command instead of only after the last one
     forwards, depth = 0, 0
+    trajectories = []
 
-    with open(path) as f:
-        while line := f.readline():
-            direction, count = parse_line(line)
-            if direction == "forward":
-                forwards += count
-            elif direction == "down":
-                depth += count
-            else:
-                depth -= count
+    for codes, counts in iter_commands(source, chunk_bytes):
+        forward_steps = np.where(codes == FORWARD, counts, 0)
+        depth_steps = np.where(codes == DOWN, counts, 0) - np.where(codes == UP, counts, 0)
+        if trajectory:
+            trajectories.append((forwards + np.cumsum(forward_steps), depth + np.cumsum(depth_steps)))
+        forwards += int(forward_steps.sum())
+        depth += int(depth_steps.sum())
 
+    if trajectory:
+        return concatenate_trajectories(trajectories)
     return forwards, depth
 
 
-def move_aimed(path) -> Tuple[int, int]:
+def move_aimed(source: Source, trajectory=False, chunk_bytes: int = CHUNK_BYTES) \
+        -> Union[Tuple[int, int], Tuple[np.ndarray, np.ndarray]]:
+    # The aim after every command is a prefix sum of the up/down counts, and the depth a prefix sum of the
+    # forward counts times that aim. Both continue from the totals of the previous chunk.
     forwards, depth = 0, 0
     aim = 0
+    trajectories = []
 
-    with open(path) as f:
-        while line := f.readline():
-            direction, count = parse_line(line)
-            if direction == "forward":
-                forwards += count
-                depth += count * aim
-            elif direction == "down":
-                aim += count
-            else:
-                aim -= count
+    for codes, counts in iter_commands(source, chunk_bytes):
+        forward_steps = np.where(codes == FORWARD, counts, 0)
+        aims = aim + np.cumsum(np.where(codes == DOWN, counts, 0) - np.where(codes == UP, counts, 0))
+        depth_steps = forward_steps * aims
+        if trajectory:
+            trajectories.append((forwards + np.cumsum(forward_steps), depth + np.cumsum(depth_steps)))
+        forwards += int(forward_steps.sum())
+        depth += int(depth_steps.sum())
+        if len(aims):
+            aim = int(aims[-1])
 
+    if trajectory:
+        return concatenate_trajectories(trajectories)
     return forwards, depth
 
 
-def test_part_1():
-    f, d = move("./data/example.txt")
+class Summary(NamedTuple):
+    # The effect of a run of commands when starting at aim 0: the forward distance, the change of aim and the
+    # depth gained. The depth of a later run grows by its forward distance times the aim built up before it, so
+    # summaries combine associatively and runs can be summarised independently.
+    forward: int = 0
+    aim: int = 0
+    depth: int = 0
+
+    def then(self, other: "Summary") -> "Summary":
+        return Summary(self.forward + other.forward, self.aim + other.aim,
+                       self.depth + other.depth + self.aim * other.forward)
+
+
+def summarise(codes: np.ndarray, counts: np.ndarray) -> Summary:
+    forward_steps = np.where(codes == FORWARD, counts, 0)
+    aims = np.cumsum(np.where(codes == DOWN, counts, 0) - np.where(codes == UP, counts, 0))
+    return Summary(int(forward_steps.sum()), int(aims[-1]) if len(aims) else 0, int((forward_steps * aims).sum()))
+
+
+def summarise_chunks(chunks: Iterable[bytes]) -> Summary:
+    return reduce(Summary.then, (summarise(*parse_commands(chunk)) for chunk in chunks), Summary())
+
+
+def summarise_range(path: str, start: int, end: int, chunk_bytes: int = CHUNK_BYTES) -> Summary:
+    return summarise_chunks(iter_file_range(path, start, end, chunk_bytes))
+
+
+def last_line_end(path: str, size: int) -> int:
+    # Offset just after the last newline, a log that is being written to may end in a partial line
+    with open(path, "rb") as f:
+        end = size
+        while end > 0:
+            start = max(0, end - CHECKPOINT_CONTEXT)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline != -1:
+                return start + newline + 1
+            end = start
+    return 0
+
+
+def context_hash(path: str, offset: int) -> str:
+    with open(path, "rb") as f:
+        f.seek(max(0, offset - CHECKPOINT_CONTEXT))
+        return hashlib.sha256(f.read(min(offset, CHECKPOINT_CONTEXT))).hexdigest()
+
+
+def load_checkpoint(path: str, checkpoint: str, size: int) -> Tuple[int, Summary]:
+    if not os.path.exists(checkpoint):
+        return 0, Summary()
+    with open(checkpoint) as f:
+        state = json.load(f)
+
+    # Only resume when the log was appended to, a rewritten log starts over
+    offset = state["offset"]
+    if offset > size or context_hash(path, offset) != state["hash"]:
+        return 0, Summary()
+    return offset, Summary(*state["summary"])
+
+
+def save_checkpoint(path: str, checkpoint: str, offset: int, summary: Summary):
+    state = {"offset": offset, "hash": context_hash(path, offset), "summary": list(summary)}
+    with open(checkpoint + ".tmp", "w") as f:
+        json.dump(state, f)
+    os.replace(checkpoint + ".tmp", checkpoint)
+
+
+def move_aimed_parallel(path: str, workers: Optional[int] = None, checkpoint: Optional[str] = None,
+                        growing: bool = False, chunk_bytes: int = CHUNK_BYTES) -> Tuple[int, int]:
+    # Summarises line aligned parts of the file in worker processes and combines the summaries in order. With a
+    # checkpoint, the summary of all complete lines is stored, and the next call only reads what was appended.
+    # With growing, the file is a log that is still being written to, so a last line without a newline may be cut
+    # off (e.g. "forw" or the "forward 1" of "forward 12") and is left for a later call.
+    size = os.path.getsize(path)
+    offset, summary = load_checkpoint(path, checkpoint, size) if checkpoint else (0, Summary())
+    end = last_line_end(path, size)
+
+    # No more parts than chunks, a small appended tail isn't worth starting processes for
+    workers = min(workers or os.cpu_count(), -(-(end - offset) // chunk_bytes))
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(summarise_range, path, start, stop, chunk_bytes)
+                       for start, stop in split_file(path, workers, offset, end)]
+            summary = reduce(Summary.then, (future.result() for future in futures), summary)
+    else:
+        summary = summary.then(summarise_range(path, offset, end, chunk_bytes))
+
+    if checkpoint:
+        save_checkpoint(path, checkpoint, end, summary)
+    if end < size and not growing:
+        summary = summary.then(summarise_range(path, end, size, chunk_bytes))
+    return summary.forward, summary.depth
+
+
+def concatenate_trajectories(trajectories: List[Tuple[np.ndarray, np.ndarray]]) -> Tuple[np.ndarray, np.ndarray]:
+    if not trajectories:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    forwards, depths = zip(*trajectories)
+    return np.concatenate(forwards), np.concatenate(depths)
+
+
+def test_part_1(data_dir: str = "./data"):
+    f, d = move(f"{data_dir}/example.txt")
     correct_f = 15
     correct_d = 10
     assert correct_f == f, f"{correct_f} != {f}"
     assert correct_d == d, f"{correct_d} != {d}"
 
+    # The blank lines end up in a chunk of their own, which holds no commands
+    f, d = move(["forward 5\n", "\n", "\n", "down 3\n"], chunk_bytes=1)
+    assert (5, 3) == (f, d), f"{(5, 3)} != {(f, d)}"
+
 
-def test_part_2():
-    f, d = move_aimed("./data/example.txt")
+def test_part_2(data_dir: str = "./data"):
+    f, d = move_aimed(f"{data_dir}/example.txt")
     correct_f = 15
     correct_d = 60
     assert correct_f == f, f"{correct_f} != {f}"
     assert correct_d == d, f"{correct_d} != {d}"
 
+    # Tiny chunks, so the aim has to be carried over between nearly every command
+    fs, ds = move_aimed(f"{data_dir}/example.txt", trajectory=True, chunk_bytes=8)
+    correct_fs = [5, 5, 13, 13, 13, 15]
+    correct_ds = [0, 0, 40, 40, 40, 60]
+    assert correct_fs == fs.tolist(), f"{correct_fs} != {fs.tolist()}"
+    assert correct_ds == ds.tolist(), f"{correct_ds} != {ds.tolist()}"
 
-def part_1():
-    f, d = move("./data/input.txt")
+    f, d = move_aimed_parallel(f"{data_dir}/example.txt", workers=4, chunk_bytes=8)
+    assert (correct_f, correct_d) == (f, d), f"{(correct_f, correct_d)} != {(f, d)}"
+
+    # A log that is still being written to, cut inside a word and then inside a number
+    with tempfile.TemporaryDirectory() as directory:
+        log, checkpoint = os.path.join(directory, "log.txt"), os.path.join(directory, "log.checkpoint")
+        for appended, correct in [(b"forward 5\ndown 3\nforward 2\nforw", (7, 6)),
+                                  (b"ard 1", (7, 6)),
+                                  (b"2\nup 1\n", (19, 42))]:
+            with open(log, "ab") as log_file:
+                log_file.write(appended)
+            for workers, path in [(1, checkpoint), (4, None)]:
+                f, d = move_aimed_parallel(log, workers, path, growing=True, chunk_bytes=8)
+                assert correct == (f, d), f"{correct} != {(f, d)}"
+
+
+def part_1(data_dir: str = "./data"):
+    f, d = move(f"{data_dir}/input.txt")
     print("Solution part 1:")
     print(f"Forwards: {f}")
     print(f"Depth: {d}")
     print(f"Multiplication: {f * d}")
 
 
-def part_2():
-    f, d = move_aimed("./data/input.txt")
+def part_2(data_dir: str = "./data"):
+    f, d = move_aimed(f"{data_dir}/input.txt")
     print("Solution part 2:")
     print(f"Forwards: {f}")
     print(f"Depth: {d}")
@@ -73,6 +240,22 @@ def part_2():
 
 
 if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        # e.g. zcat commands.gz | python main.py - aimed, or for a growing log
+        # AOC_WORKERS=32 AOC_CHECKPOINT=log.checkpoint python main.py log.txt aimed
+        workers = int(os.environ.get("AOC_WORKERS", 1))
+        checkpoint = os.environ.get("AOC_CHECKPOINT")
+        if sys.argv[2:] != ["aimed"]:
+            f, d = move(sys.argv[1])
+        elif sys.argv[1] != "-" and (workers > 1 or checkpoint):
+            f, d = move_aimed_parallel(sys.argv[1], workers, checkpoint, growing=checkpoint is not None)
+        else:
+            f, d = move_aimed(sys.argv[1])
+        print(f"Forwards: {f}")
+        print(f"Depth: {d}")
+        print(f"Multiplication: {f * d}")
+        sys.exit()
+
     test_part_1()
     part_1()
     print()
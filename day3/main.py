@@ -1,87 +1,205 @@
-from typing import Tuple
-import numpy as np
-
-
-def bit_array_to_base_10(bits: np.ndarray) -> int:
-    return sum([v << i for i, v in enumerate(bits[::-1])])
-
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
 
-def power_consumption(path) -> Tuple[int, int]:
-    lines = 0
-    arr_sum = None
-    with open(path) as f:
-        while line := f.readline().strip():
-            lines += 1
-            arr = np.array(list(line), dtype=int)
-
-            if arr_sum is None:
-                arr_sum = arr
-            else:
-                arr_sum += arr
+import numpy as np
 
-    bits = arr_sum > lines / 2
-    gamma = bit_array_to_base_10(bits)
-    eps = bit_array_to_base_10(np.invert(bits))
+from util import CHUNK_BYTES, Source, iter_chunks
+
+
+class Report:
+    # Every line packed into one unsigned integer of the smallest of 8, 16, 32 or 64 bits that fits, wider
+    # reports into big endian byte rows (np.packbits) with the padding on the left. Either way the rows sort and
+    # compare like the binary numbers they are.
+    def __init__(self, values: np.ndarray, width: int):
+        self.values = values
+        self.width = width
+
+    def __len__(self):
+        return len(self.values)
+
+    @property
+    def wide(self) -> bool:
+        return self.values.ndim == 2
+
+    def column(self, i: int) -> np.ndarray:
+        # Bit i counted from the left, as a boolean per line
+        shift = self.width - 1 - i
+        if self.wide:
+            byte = self.values.shape[1] - 1 - shift // 8
+            return (self.values[:, byte] >> (shift % 8)) & 1 == 1
+        return (self.values >> self.values.dtype.type(shift)) & 1 == 1
+
+    def column_counts(self, block: int = 1 << 20) -> np.ndarray:
+        # The number of ones in every column, from the left
+        if self.wide:
+            pad = self.values.shape[1] * 8 - self.width
+            counts = np.zeros(self.values.shape[1] * 8, dtype=np.int64)
+            for start in range(0, len(self), block):
+                counts += np.unpackbits(self.values[start: start + block], axis=1).sum(axis=0, dtype=np.int64)
+            return counts[pad:]
+        return np.array([np.count_nonzero(self.column(i)) for i in range(self.width)], dtype=np.int64)
+
+    def to_int(self, row) -> int:
+        if self.wide:
+            return int.from_bytes(row.tobytes(), "big")
+        return int(row)
+
+    def sorted_keys(self) -> np.ndarray:
+        # Wide rows are compared as opaque byte strings, which for big endian rows is the numeric order
+        if self.wide:
+            return np.sort(np.ascontiguousarray(self.values).view(f"V{self.values.shape[1]}").ravel())
+        return np.sort(self.values)
+
+    def key(self, value: int):
+        if self.wide:
+            return np.frombuffer(value.to_bytes(self.values.shape[1], "big"), dtype=f"V{self.values.shape[1]}")[0]
+        return self.values.dtype.type(value)
+
+
+def pack_bits(bits: np.ndarray) -> np.ndarray:
+    # (n, width) zeros and ones to the values of a Report
+    n, width = bits.shape
+    n_bytes = -(-width // 8)
+    if n_bytes <= 8:
+        # Round up to a size numpy has an integer type for
+        n_bytes = 1 << (n_bytes - 1).bit_length()
+    pad = n_bytes * 8 - width
+
+    packed = np.packbits(np.concatenate((np.zeros((n, pad), dtype=np.uint8), bits), axis=1), axis=1)
+    if n_bytes > 8:
+        return packed
+    return packed.view(f">u{n_bytes}").ravel().astype(f"u{n_bytes}")
+
+
+def bits_to_int(bits: np.ndarray) -> int:
+    pad = -len(bits) % 8
+    return int.from_bytes(np.packbits(np.concatenate((np.zeros(pad, dtype=np.uint8), bits))).tobytes(), "big")
+
+
+def parse_input(source: Source, chunk_bytes: int = CHUNK_BYTES) -> Report:
+    # One pass over the file, each chunk is unpacked to a byte per bit only while it gets packed
+    width = None
+    blocks: List[np.ndarray] = []
+    for chunk in iter_chunks(source, chunk_bytes):
+        if width is None:
+            if not chunk.split():
+                continue
+            width = len(chunk.split(None, 1)[0])
+
+        digits = np.frombuffer(chunk.translate(None, b" \t\r\n"), dtype=np.uint8)
+        if len(digits) % width:
+            raise ValueError("Not every line of the report has the same number of bits")
+        blocks.append(pack_bits((digits - ord("0")).reshape(-1, width)))
+
+    if width is None:
+        raise ValueError("Empty report")
+    return Report(np.concatenate(blocks), width)
+
+
+def power_consumption(source: Source) -> Tuple[int, int]:
+    return gamma_epsilon(parse_input(source))
+
+
+def gamma_epsilon(report: Report) -> Tuple[int, int]:
+    bits = (report.column_counts() > len(report) / 2).astype(np.uint8)
+    gamma = bits_to_int(bits)
+    eps = bits_to_int(1 - bits)
     return gamma, eps
 
 
-def test_part_1():
-    gamma, epsilon = power_consumption("./data/example.txt")
+def test_part_1(data_dir: str = "./data"):
+    gamma, epsilon = power_consumption(f"{data_dir}/example.txt")
     correct_g = 22
     correct_e = 9
     assert correct_g == gamma, f"{correct_g} != {gamma}"
     assert correct_e == epsilon, f"{correct_e} != {epsilon}"
 
 
-def part_1():
-    gamma, epsilon = power_consumption("./data/input.txt")
+def part_1(data_dir: str = "./data"):
+    gamma, epsilon = power_consumption(f"{data_dir}/input.txt")
     print("Solution part 1:")
     print(f"Gamma: {gamma}")
     print(f"Epsilon: {epsilon}")
     print(f"Mult: {gamma * epsilon}")
 
 
-def do_masking(matrix: np.ndarray, oxygen=True) -> int:
-    # I'm certain a specific set of bitwise operations can also work
-    n_lines, n_bits = matrix.shape
+def find_rating(report: Report, keys: np.ndarray, oxygen=True) -> int:
+    # keys[lo:hi] are the sorted lines that still start with prefix, the ones among them with a 1 as the next bit
+    # come after all that have a 0 there. So every bit only needs one binary search.
+    lo, hi = 0, len(keys)
+    prefix = 0
 
-    mask = np.ones(n_lines, dtype=bool)
-    masked = matrix
+    for i in range(report.width):
+        if hi - lo == 1:
+            break
 
-    for i in range(n_bits):
+        bit = 1 << (report.width - 1 - i)
+        split = int(np.searchsorted(keys, report.key(prefix | bit)))
+        ones = hi - split
         if oxygen:
-            most_common = np.sum(masked[:, i]) >= len(masked) / 2
+            most_common = ones >= (hi - lo) / 2
         else:
-            most_common = np.sum(masked[:, i]) < len(masked) / 2
+            most_common = ones < (hi - lo) / 2
 
-        mask = mask & (matrix[:, i] == most_common)
-        masked = matrix[mask]
+        if most_common:
+            lo = split
+            prefix |= bit
+        else:
+            hi = split
 
-        if len(masked) == 1:
-            return bit_array_to_base_10(masked[0])
-        if len(masked) == 0:
+        if hi == lo:
             raise Exception("No lines remaining")
 
+    return report.to_int(keys[lo])
+
 
-def calc_co2_oxy(path: str) -> Tuple[int, int]:
-    lines = []
+def calc_co2_oxy(source: Source) -> Tuple[int, int]:
+    return co2_oxy(parse_input(source))
 
-    with open(path) as f:
-        while line := f.readline().strip():
-            lines.append([int(v) for v in line])
 
-    matrix = np.array(lines)
-    return do_masking(matrix, oxygen=False), do_masking(matrix, oxygen=True)
+def co2_oxy(report: Report) -> Tuple[int, int]:
+    keys = report.sorted_keys()
+    return find_rating(report, keys, oxygen=False), find_rating(report, keys, oxygen=True)
 
 
-def test_part_2():
-    co2, ox = calc_co2_oxy("./data/example.txt")
+class Diagnosis(NamedTuple):
+    gamma: int
+    epsilon: int
+    co2: int
+    oxygen: int
+
+
+def diagnose(path: str) -> Diagnosis:
+    # Both parts from a single parse of the report
+    report = parse_input(path)
+    return Diagnosis(*gamma_epsilon(report), *co2_oxy(report))
+
+
+def diagnose_many(paths: Iterable[str], workers: Optional[int] = None, processes=False) \
+        -> Iterator[Tuple[str, Diagnosis]]:
+    # Yields (path, diagnosis) as soon as each report is done, so not in the given order. Threads are enough for
+    # large reports as numpy releases the GIL while parsing, counting and sorting, processes help with many small
+    # ones.
+    executor = ProcessPoolExecutor if processes else ThreadPoolExecutor
+    with executor(max_workers=workers) as pool:
+        futures = {pool.submit(diagnose, path): path for path in paths}
+        for future in as_completed(futures):
+            yield futures[future], future.result()
+
+
+def test_part_2(data_dir: str = "./data"):
+    co2, ox = calc_co2_oxy(f"{data_dir}/example.txt")
     correct_ox = 23
     assert correct_ox == ox, f"{correct_ox} != {ox}"
 
+    results = dict(diagnose_many([f"{data_dir}/example.txt"]))
+    correct = Diagnosis(gamma=22, epsilon=9, co2=10, oxygen=23)
+    assert correct == results[f"{data_dir}/example.txt"], f"{correct} != {results[f'{data_dir}/example.txt']}"
 
-def part_2():
-    co2, ox = calc_co2_oxy("./data/input.txt")
+
+def part_2(data_dir: str = "./data"):
+    co2, ox = calc_co2_oxy(f"{data_dir}/input.txt")
     print("Solution part 2:")
     print(f"CO2: {co2}")
     print(f"Oxygen: {ox}")
@@ -89,6 +207,13 @@ def part_2():
 
 
 if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        # e.g. python main.py reports/*.txt
+        for path, diagnosis in diagnose_many(sys.argv[1:]):
+            print(f"{path}: power {diagnosis.gamma * diagnosis.epsilon}, "
+                  f"life support {diagnosis.co2 * diagnosis.oxygen} {tuple(diagnosis)}")
+        sys.exit()
+
     test_part_1()
     part_1()
     print()
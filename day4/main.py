@@ -1,19 +1,33 @@
-from typing import List, Tuple
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
 import numpy as np
 
+from util import CHUNK_BYTES, Source, iter_chunks, parse_ints
 
-def parse_input(path: str, board_size=5) -> Tuple[List[int], List[np.ndarray]]:
-    boards = []
-    with open(path) as f:
-        draws = f.readline().split(sep=",")
-        draws = [int(d) for d in draws]
-        while f.readline():
-            board = []
-            for _ in range(board_size):
-                board.append(list(map(int, f.readline().strip().split())))
-            boards.append(np.array(board))
+# A list of square boards, or all of them stacked as one (boards, size, size) array
+Boards = Union[List[np.ndarray], np.ndarray]
 
-    return draws, boards
+
+def parse_input(source: Source, board_size: Optional[int] = None, dtype=np.int64,
+                chunk_bytes: int = CHUNK_BYTES) -> Tuple[List[int], np.ndarray]:
+    # The boards as one (boards, size, size) array, the size is taken from the first board unless given. Any
+    # Source works, including an open mmap.mmap of a deck too large to read in at once.
+    draws = None
+    blocks: List[np.ndarray] = []
+    for chunk in iter_chunks(source, chunk_bytes):
+        if draws is None:
+            line, _, chunk = chunk.partition(b"\n")
+            draws = [int(d) for d in line.split(b",")]
+        if board_size is None:
+            board_size = next((len(row.split()) for row in chunk.split(b"\n") if row.strip()), None)
+        blocks.append(parse_ints(chunk, dtype))
+
+    if draws is None:
+        raise ValueError("Empty input")
+    numbers = np.concatenate(blocks)
+    board_size = board_size or 5
+    if len(numbers) % (board_size * board_size):
+        raise ValueError(f"The boards are not all {board_size}x{board_size}")
+    return draws, numbers.reshape(-1, board_size, board_size)
 
 
 def calc_board_score(board: np.ndarray, mask: np.ndarray, last_draw: int) -> int:
@@ -21,72 +35,128 @@ def calc_board_score(board: np.ndarray, mask: np.ndarray, last_draw: int) -> int
     return s * last_draw
 
 
-def has_won(board, mask):
-    if np.any(np.sum(mask, axis=0) == board.shape[0]):
-        return True
-    if np.any(np.sum(mask, axis=1) == board.shape[1]):
-        return True
-    return False
-
-
-def get_empty_masks(shape: Tuple, n: int) -> List[np.ndarray]:
-    return [np.zeros(shape, dtype=bool) for _ in range(n)]
-
-
-def bingo(draws: List[int], boards: List[np.ndarray]) -> int:
-    masks = get_empty_masks(boards[0].shape, len(boards))
-
-    for d in draws:
-        for board, mask in zip(boards, masks):
-            mask[board == d] = True
-
-            if has_won(board, mask):
-                return calc_board_score(board, mask, d)
-    raise Exception("No winner")
-
-
-def bingo_lose(draws: List[int], boards: List[np.ndarray]) -> int:
-    masks = get_empty_masks(boards[0].shape, len(boards))
-
-    for d in draws:
-        pops = []
-        for i, (board, mask) in enumerate(zip(boards, masks)):
-            mask[board == d] = True
-            if has_won(board, mask):
-                pops.append(i)
-
-        for i, pop in enumerate(pops):
-            if len(boards) == 1:
-                return calc_board_score(boards[0], masks[0], d)
-            boards.pop(pop - i)
-            masks.pop(pop - i)
-
-    raise Exception("No loser")
-
-
-def test_part_1():
-    draws, boards = parse_input("./data/example.txt")
+def draw_turns(draws: List[int], boards: Boards) -> np.ndarray:
+    # The turn every cell gets drawn at, len(draws) for cells that never are
+    boards = np.asarray(boards)
+    lookup = np.full(max(max(draws), boards.max()) + 1, len(draws), dtype=np.int64)
+    # Reversed, so the first draw of a repeated number wins
+    lookup[np.array(draws[::-1])] = np.arange(len(draws))[::-1]
+    return lookup[boards]
+
+
+def win_turns(turns: np.ndarray) -> np.ndarray:
+    # A line is complete at the last turn of its cells, a board at its first complete row or column
+    return np.minimum(turns.max(axis=2).min(axis=1), turns.max(axis=1).min(axis=1))
+
+
+def board_scores(draws: List[int], boards: Boards, turns: np.ndarray, wins: np.ndarray) -> np.ndarray:
+    # The score of every board at the turn it wins, 0 for boards that never do
+    boards = np.asarray(boards)
+    unmarked = np.where(turns > wins[:, None, None], boards, 0).sum(axis=(1, 2))
+    last_draws = np.append(np.array(draws), 0)[wins]
+    return unmarked * last_draws
+
+
+def ranking(draws: List[int], boards: Boards) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    # Board indices from the first to the last winner (ties in board order) with their win turns and scores,
+    # boards that never win come last with turn len(draws)
+    turns = draw_turns(draws, boards)
+    wins = win_turns(turns)
+    order = np.argsort(wins, kind="stable")
+    return order, wins[order], board_scores(draws, boards, turns, wins)[order]
+
+
+def bingo(draws: List[int], boards: Boards) -> int:
+    order, wins, scores = ranking(draws, boards)
+    if wins[0] == len(draws):
+        raise Exception("No winner")
+    return int(scores[0])
+
+
+def bingo_lose(draws: List[int], boards: Boards) -> int:
+    order, wins, scores = ranking(draws, boards)
+    if wins[-1] == len(draws):
+        raise Exception("No loser")
+    # Of boards that win on the same last turn, the one that comes last is the loser
+    return int(scores[-1])
+
+
+class BingoHall:
+    # Live play, one draw at a time. All cards live in one array, an inverted index from number to the cells that
+    # hold it and per line hit counters mean a draw only touches the cells with that number.
+    def __init__(self, boards: Boards):
+        self.boards = np.ascontiguousarray(boards)
+        self.n_boards, self.size, _ = self.boards.shape
+
+        # CSR: the flat cells holding number v are cells[indptr[v]:indptr[v + 1]]
+        flat = self.boards.ravel()
+        self.cells = np.argsort(flat, kind="stable")
+        self.indptr = np.zeros(flat.max() + 2, dtype=np.int64)
+        np.cumsum(np.bincount(flat), out=self.indptr[1:])
+
+        self.marked = np.zeros(flat.shape, dtype=bool)
+        self.row_hits = np.zeros((self.n_boards, self.size), dtype=np.int64)
+        self.column_hits = np.zeros((self.n_boards, self.size), dtype=np.int64)
+        self.unmarked_sums = self.boards.sum(axis=(1, 2), dtype=np.int64)
+        self.won = np.zeros(self.n_boards, dtype=bool)
+        self.winners: List[int] = []
+
+    def draw(self, value: int) -> List[Tuple[int, int]]:
+        # The (board, score) of every board that won with this draw, in board order
+        if not 0 <= value < len(self.indptr) - 1:
+            return []
+        cells = self.cells[self.indptr[value]: self.indptr[value + 1]]
+        cells = cells[~self.marked[cells]]
+        self.marked[cells] = True
+
+        boards, rest = np.divmod(cells, self.size * self.size)
+        rows, columns = np.divmod(rest, self.size)
+        np.add.at(self.row_hits, (boards, rows), 1)
+        np.add.at(self.column_hits, (boards, columns), 1)
+        np.subtract.at(self.unmarked_sums, boards, value)
+
+        complete = (self.row_hits[boards, rows] == self.size) | (self.column_hits[boards, columns] == self.size)
+        new = np.unique(boards[complete & ~self.won[boards]])
+        self.won[new] = True
+        self.winners.extend(new.tolist())
+        return [(board, int(self.unmarked_sums[board]) * value) for board in new.tolist()]
+
+    def play(self, draws: Iterable[int]) -> Iterator[Tuple[int, int, int]]:
+        # (draw, board, score) events as boards win
+        for value in draws:
+            for board, score in self.draw(value):
+                yield value, board, score
+
+
+def test_part_1(data_dir: str = "./data"):
+    draws, boards = parse_input(f"{data_dir}/example.txt")
     score = bingo(draws, boards)
     correct_score = 4512
     assert correct_score == score, f"{correct_score} != {score}"
 
+    _, board, score = next(BingoHall(boards).play(draws))
+    assert (2, correct_score) == (board, score), f"{(2, correct_score)} != {(board, score)}"
 
-def part_1():
-    draws, boards = parse_input("./data/input.txt")
+
+def part_1(data_dir: str = "./data"):
+    draws, boards = parse_input(f"{data_dir}/input.txt")
     score = bingo(draws, boards)
     print("Solution part 1:")
     print(f"Board score: {score}")
 
 
-def test_part_2():
-    draws, boards = parse_input("./data/example.txt")
+def test_part_2(data_dir: str = "./data"):
+    draws, boards = parse_input(f"{data_dir}/example.txt")
     score = bingo_lose(draws, boards)
     correct_score = 1924
     assert correct_score == score, f"{correct_score} != {score}"
 
+    *_, (_, board, score) = BingoHall(boards).play(draws)
+    assert (1, correct_score) == (board, score), f"{(1, correct_score)} != {(board, score)}"
+
 
-def part_2():
-    draws, boards = parse_input("./data/input.txt")
+def part_2(data_dir: str = "./data"):
+    draws, boards = parse_input(f"{data_dir}/input.txt")
     score = bingo_lose(draws, boards)
     print("Solution part 2:")
     print(f"Board score: {score}")
@@ -1,107 +1,391 @@
-import re
-from typing import List, Tuple
+import os
+import sys
+import tempfile
+from typing import Tuple, Iterable, Iterator, Optional, Union
 
 import numpy as np
 
+from util import CHUNK_BYTES, Source, iter_chunks, parse_ints, render, rendering_enabled
 
-def is_diagonal(x1: int, y1: int, x2: int, y2: int) -> bool:
-    return abs(x1 - x2) == abs(y1 - y2)
+Segment = Tuple[int, int, int, int]
 
 
-def parse_input(path: str, allow_diagonal=False) -> Tuple[List[Tuple[int, int, int, int]], int, int]:
-    lines = []
-    max_x = 0
-    max_y = 0
+# Rasterize at most this many cells at once
+BATCH_CELLS = 1 << 22
+# Side of the square tiles draw_lines_tiled draws at once
+TILE = 512
+# find_danger draws a map when the bounding box is at most SPARSE_RATIO times the total length of the segments: in
+# memory up to DENSE_MAX_CELLS cells, memory mapped on disk up to TILED_MAX_CELLS. Otherwise it counts sparsely,
+# or when the segments also cover more than SPARSE_MAX_CELLS cells, sweeps along them.
+DENSE_MAX_CELLS = 1 << 26
+TILED_MAX_CELLS = 1 << 34
+SPARSE_RATIO = 16
+SPARSE_MAX_CELLS = 1 << 26
+SEPARATORS = bytes.maketrans(b",->", b"   ")
 
-    with open(path) as f:
-        while line := f.readline():
-            m = re.match(r"(\d+),(\d+) -> (\d+),(\d+)", line)
-            x1, y1, x2, y2 = m.groups()
-            x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
 
-            if x1 != x2 and y1 != y2:
-                if not allow_diagonal or not is_diagonal(x1, y1, x2, y2):
-                    continue
+def is_diagonal(x1: int, y1: int, x2: int, y2: int) -> bool:
+    return abs(x1 - x2) == abs(y1 - y2)
 
-            lines.append((x1, y1, x2, y2))
 
-            if x1 > max_x:
-                max_x = x1
-            if x2 > max_x:
-                max_x = x2
-            if y1 > max_y:
-                max_y = y1
-            if y2 > max_y:
-                max_y = y2
+def parse_segments(chunk: bytes, allow_diagonal=False) -> np.ndarray:
+    # "x1,y1 -> x2,y2" lines to an (n, 4) array, without the diagonals that aren't allowed or aren't at 45 degrees
+    segments = parse_ints(chunk.translate(SEPARATORS)).reshape(-1, 4)
+    dx = np.abs(segments[:, 0] - segments[:, 2])
+    dy = np.abs(segments[:, 1] - segments[:, 3])
+    keep = (dx == 0) | (dy == 0)
+    if allow_diagonal:
+        keep |= dx == dy
+    return segments[keep]
 
-    return lines, max_x, max_y
 
+def iter_segments(source: Source, allow_diagonal=False, chunk_bytes: int = CHUNK_BYTES) -> Iterator[np.ndarray]:
+    for chunk in iter_chunks(source, chunk_bytes):
+        yield parse_segments(chunk, allow_diagonal)
 
-def draw_diagonal(arr: np.ndarray, x1: int, y1: int, x2: int, y2: int):
-    x_stride = -1 if x1 > x2 else 1
-    y_stride = -1 if y1 > y2 else 1
 
-    for x, y in zip(range(x1, x2 + x_stride, x_stride), range(y1, y2 + y_stride, y_stride)):
-        arr[y, x] += 1
+def parse_input(source: Source, allow_diagonal=False) -> Tuple[np.ndarray, int, int]:
+    lines = np.concatenate([np.zeros((0, 4), dtype=np.int64), *iter_segments(source, allow_diagonal)])
+    if len(lines) == 0:
+        return lines, 0, 0
+    return lines, int(lines[:, [0, 2]].max()), int(lines[:, [1, 3]].max())
 
 
-def draw_lines(lines: List[Tuple[int, int, int, int]], max_x: int, max_y: int) -> np.ndarray:
-    arr = np.zeros((max_y + 1, max_x + 1), dtype=int)
+def iter_blocks(lines: Iterable[Union[Segment, np.ndarray]]) -> Iterator[np.ndarray]:
+    # (n, 4) blocks of segments, from an (n, 4) array, an iterable of such blocks or of single segments
+    if isinstance(lines, np.ndarray):
+        yield lines.reshape(-1, 4)
+        return
+
+    single = []
     for line in lines:
-        x1, y1, x2, y2 = line
-        if is_diagonal(x1, y1, x2, y2):
-            draw_diagonal(arr, x1, y1, x2, y2)
+        if isinstance(line, np.ndarray) and line.ndim == 2:
+            yield line
         else:
-            if x2 < x1:
-                x1, x2 = x2, x1
-            if y2 < y1:
-                y1, y2 = y2, y1
-
-            arr[y1:y2 + 1, x1:x2 + 1] += 1
+            single.append(line)
+            if len(single) == 4096:
+                yield np.array(single, dtype=np.int64)
+                single = []
+    if single:
+        yield np.array(single, dtype=np.int64).reshape(-1, 4)
+
+
+def segment_lengths(segments: np.ndarray) -> np.ndarray:
+    return np.maximum(np.abs(segments[:, 2] - segments[:, 0]), np.abs(segments[:, 3] - segments[:, 1])) + 1
+
+
+def segment_cells(segments: np.ndarray, starts: Optional[np.ndarray] = None, lengths: Optional[np.ndarray] = None) \
+        -> Tuple[np.ndarray, np.ndarray]:
+    # The (ys, xs) of every cell covered by every segment. Horizontal, vertical and diagonal segments alike step
+    # sign(d) per cell in both directions, for max(|dx|, |dy|) + 1 cells. Or only the lengths cells from step
+    # starts on, see clip_segments.
+    x1, y1, x2, y2 = segments.T
+    if lengths is None:
+        starts = np.zeros(len(segments), dtype=np.int64)
+        lengths = segment_lengths(segments)
+    ids = np.repeat(np.arange(len(segments)), lengths)
+    steps = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths - starts, lengths)
+    xs = x1[ids] + np.sign(x2 - x1)[ids] * steps
+    ys = y1[ids] + np.sign(y2 - y1)[ids] * steps
+    return ys, xs
+
+
+def iter_batches(lengths: np.ndarray, max_cells: int = BATCH_CELLS) -> Iterator[slice]:
+    # Runs of segments that cover at most max_cells cells together (or a single longer segment)
+    ends = np.cumsum(lengths)
+    start = 0
+    while start < len(lengths):
+        covered = ends[start - 1] if start else 0
+        stop = max(int(np.searchsorted(ends, covered + max_cells, side="right")), start + 1)
+        yield slice(start, stop)
+        start = stop
+
+
+def clip_segments(segments: np.ndarray, x0: int, x1: int, y0: int, y1: int) -> Tuple[np.ndarray, np.ndarray]:
+    # The first step and number of steps of every segment that fall within x0 <= x < x1, y0 <= y < y1
+    lengths = segment_lengths(segments)
+    first = np.zeros(len(segments), dtype=np.int64)
+    last = lengths - 1
+    for position, end, lo, hi in ((segments[:, 0], segments[:, 2], x0, x1), (segments[:, 1], segments[:, 3], y0, y1)):
+        sign = np.sign(end - position)
+        first = np.maximum(first, np.select([sign > 0, sign < 0], [lo - position, position - (hi - 1)], 0))
+        last = np.minimum(last, np.select([sign > 0, sign < 0], [hi - 1 - position, position - lo], last))
+        # A segment that doesn't move along this axis is either in the range all along or not at all
+        last = np.where((sign == 0) & ((position < lo) | (position >= hi)), -1, last)
+    return first, np.maximum(last - first + 1, 0)
+
+
+def grow(arr: np.ndarray, max_x: int, max_y: int) -> np.ndarray:
+    if max_y < arr.shape[0] and max_x < arr.shape[1]:
+        return arr
+    # Doubling keeps the number of copies logarithmic in the final size
+    rows = arr.shape[0] if max_y < arr.shape[0] else max(max_y + 1, 2 * arr.shape[0])
+    columns = arr.shape[1] if max_x < arr.shape[1] else max(max_x + 1, 2 * arr.shape[1])
+    grown = np.zeros((rows, columns), dtype=arr.dtype)
+    grown[:arr.shape[0], :arr.shape[1]] = arr
+    return grown
+
+
+def draw_lines(lines: Iterable[Union[Segment, np.ndarray]], max_x: Optional[int] = None,
+               max_y: Optional[int] = None) -> np.ndarray:
+    # Without the bounds the map grows while the lines are drawn, so lines can be streamed in
+    arr = np.zeros((0 if max_y is None else max_y + 1, 0 if max_x is None else max_x + 1), dtype=int)
+    used_x, used_y = -1, -1
+    for block in iter_blocks(lines):
+        if len(block) == 0:
+            continue
+        used_x, used_y = max(used_x, int(block[:, [0, 2]].max())), max(used_y, int(block[:, [1, 3]].max()))
+        arr = grow(arr, used_x, used_y)
+
+        for batch in iter_batches(segment_lengths(block), max(BATCH_CELLS, arr.size)):
+            ys, xs = segment_cells(block[batch])
+            arr += np.bincount(ys * arr.shape[1] + xs, minlength=arr.size).reshape(arr.shape)
+
+    if max_x is None or max_y is None:
+        arr = arr[:used_y + 1, :used_x + 1]
     return arr
 
 
-def count_dangerous(arr: np.ndarray, min_dangerous: int) -> int:
-    return np.sum(arr >= min_dangerous)
-
-
-def print_danger(arr: np.ndarray):
-    print("  0123456789")
-    for i, a in enumerate(arr):
-        print(i, "".join([str(v) if v > 0 else "." for v in a]))
+def overlap_dtype(n_segments: int) -> np.dtype:
+    # No cell can be covered by more segments than there are
+    return np.min_scalar_type(n_segments)
+
+
+def bucket(lows: np.ndarray, highs: np.ndarray, size: int, n_buckets: int) -> Tuple[np.ndarray, np.ndarray]:
+    # The items whose range [low, high] touches bucket b (of size values each) are items[bounds[b]:bounds[b + 1]].
+    # One sort for all buckets, so the work follows the number of (item, bucket) pairs.
+    first = lows // size
+    counts = highs // size - first + 1
+    buckets = np.repeat(first - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    order = np.argsort(buckets, kind="stable")
+    items = np.repeat(np.arange(len(lows)), counts)[order]
+    return items, np.searchsorted(buckets[order], np.arange(n_buckets + 1))
+
+
+def draw_lines_tiled(segments: np.ndarray, path: str, tile: int = TILE) -> np.ndarray:
+    # draw_lines into a memory mapped .npy file, for maps larger than memory. The map is drawn one tile at a time,
+    # from the parts of the segments that fall within it, so the accumulator stays in cache and every tile is
+    # written to disk once.
+    max_x, max_y = (int(segments[:, [0, 2]].max()), int(segments[:, [1, 3]].max())) if len(segments) else (-1, -1)
+    arr = np.lib.format.open_memmap(path, mode="w+", dtype=overlap_dtype(len(segments)),
+                                    shape=(max_y + 1, max_x + 1))
+    n_columns = -(-(max_x + 1) // tile)
+    band_items, band_bounds = bucket(segments[:, [1, 3]].min(axis=1), segments[:, [1, 3]].max(axis=1), tile,
+                                     -(-(max_y + 1) // tile))
+
+    for band, y0 in enumerate(range(0, max_y + 1, tile)):
+        y1 = min(y0 + tile, max_y + 1)
+        in_band = segments[band_items[band_bounds[band]:band_bounds[band + 1]]]
+
+        # The columns of the part of every segment within the band, a diagonal only reaches a tile or two of them
+        starts, lengths = clip_segments(in_band, 0, max_x + 1, y0, y1)
+        steps = np.sign(in_band[:, 2] - in_band[:, 0])
+        xs, last_xs = in_band[:, 0] + steps * starts, in_band[:, 0] + steps * (starts + lengths - 1)
+        tile_items, tile_bounds = bucket(np.minimum(xs, last_xs), np.maximum(xs, last_xs), tile, n_columns)
+
+        for column, x0 in enumerate(range(0, max_x + 1, tile)):
+            x1 = min(x0 + tile, max_x + 1)
+            in_tile = in_band[tile_items[tile_bounds[column]:tile_bounds[column + 1]]]
+            if len(in_tile) == 0:
+                # The memory map starts out as zeros
+                continue
+            starts, lengths = clip_segments(in_tile, x0, x1, y0, y1)
+
+            accumulator = np.zeros((y1 - y0) * (x1 - x0), dtype=np.int64)
+            for batch in iter_batches(lengths):
+                ys, xs = segment_cells(in_tile[batch], starts[batch], lengths[batch])
+                accumulator += np.bincount((ys - y0) * (x1 - x0) + xs - x0, minlength=len(accumulator))
+            arr[y0:y1, x0:x1] = accumulator.reshape(y1 - y0, x1 - x0)
+
+    arr.flush()
+    return arr
 
 
-def find_danger(path: str, allow_diagonal=False) -> int:
-    lines, max_x, max_y = parse_input(path, allow_diagonal)
-    arr = draw_lines(lines, max_x, max_y)
-    return count_dangerous(arr, 2)
+def count_dangerous(arr: np.ndarray, min_dangerous: int, rows: int = TILE) -> int:
+    # A block of rows at a time, so a memory mapped map is streamed instead of read in at once
+    return sum(int(np.count_nonzero(arr[y: y + rows] >= min_dangerous)) for y in range(0, arr.shape[0], rows))
 
 
-def test_part_1():
-    solution = find_danger("./data/example.txt")
+def print_danger(arr: np.ndarray):
+    if not rendering_enabled():
+        return
+    render(np.array(list(".123456789+"))[np.minimum(arr, 10)], labels=True)
+
+
+def count_dangerous_sparse(segments: np.ndarray, min_dangerous: int) -> int:
+    # Only the covered cells are counted, keyed by (y << 32 | x) and sorted per batch. The counts of the batches
+    # are merged the same way, so memory follows the number of distinct covered cells instead of the area.
+    keys = np.zeros(0, dtype=np.uint64)
+    counts = np.zeros(0, dtype=np.int64)
+    for batch in iter_batches(segment_lengths(segments)):
+        ys, xs = segment_cells(segments[batch])
+        batch_keys, batch_counts = np.unique(ys.astype(np.uint64) << np.uint64(32) | xs.astype(np.uint64),
+                                             return_counts=True)
+        keys, inverse = np.unique(np.concatenate((keys, batch_keys)), return_inverse=True)
+        counts = np.bincount(inverse, weights=np.concatenate((counts, batch_counts)), minlength=len(keys))
+        counts = counts.astype(np.int64)
+    return int(np.count_nonzero(counts >= min_dangerous))
+
+
+# a * x + b * y == line for the lines through horizontal, vertical, diagonal (\) and anti-diagonal (/) segments
+FAMILIES = ((0, 1), (1, 0), (1, -1), (1, 1))
+
+
+def family_pieces(segments: np.ndarray, family: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # Sweep along every line of the family: the segments on it are intervals of their x (y for vertical ones),
+    # sorted +1/-1 events at the interval bounds give the pieces of constant coverage as (line, lo, hi, coverage)
+    a, b = FAMILIES[family]
+    position = 1 if family == 1 else 0
+    lines = a * segments[:, 0] + b * segments[:, 1]
+    lo = np.minimum(segments[:, position], segments[:, position + 2])
+    hi = np.maximum(segments[:, position], segments[:, position + 2])
+
+    events = np.concatenate((np.stack((lines, lo), axis=1), np.stack((lines, hi + 1), axis=1)))
+    keys, inverse = np.unique(events, axis=0, return_inverse=True)
+    deltas = np.bincount(inverse.ravel(), weights=np.repeat([1, -1], len(segments)), minlength=len(keys))
+    # Every line ends back at coverage 0, so one running sum works for all lines at once
+    coverage = np.cumsum(deltas).round().astype(np.int64)
+
+    piece = coverage[:-1] > 0
+    return keys[:-1, 0][piece], keys[:-1, 1][piece], keys[1:, 1][piece] - 1, coverage[:-1][piece]
+
+
+def crossings(f: int, pieces_f: Tuple, g: int, pieces_g: Tuple, max_pairs: int = BATCH_CELLS) \
+        -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    # The lattice points where a piece of family f crosses one of family g, as (x, y, coverage f, coverage g)
+    (a1, b1), (a2, b2) = FAMILIES[f], FAMILIES[g]
+    det = a1 * b2 - a2 * b1
+    line_f, lo_f, hi_f, cov_f = pieces_f
+    line_g, lo_g, hi_g, cov_g = pieces_g
+
+    found = []
+    block = max(1, max_pairs // max(1, len(line_g)))
+    for start in range(0, len(line_f), block):
+        i = np.arange(start, min(start + block, len(line_f)))[:, None]
+        x_num = line_f[i] * b2 - line_g * b1
+        y_num = a1 * line_g - a2 * line_f[i]
+        x, y = x_num // det, y_num // det
+        pos_f = y if f == 1 else x
+        pos_g = y if g == 1 else x
+        valid = ((x_num % det == 0) & (y_num % det == 0) & (lo_f[i] <= pos_f) & (pos_f <= hi_f[i]) &
+                 (lo_g <= pos_g) & (pos_g <= hi_g))
+        ii, jj = np.nonzero(valid)
+        found.append((x[ii, jj], y[ii, jj], cov_f[i[ii, 0]], cov_g[jj]))
+
+    if not found:
+        return tuple(np.zeros(0, dtype=np.int64) for _ in range(4))
+    return tuple(np.concatenate(column) for column in zip(*found))
+
+
+def count_dangerous_sweep(segments: np.ndarray, min_dangerous: int) -> int:
+    # Without enumerating cells, for long segments on a huge map. A cell's coverage is the sum of the coverage of
+    # the line through it of every family. Cells on a single family's line are counted from the swept pieces,
+    # only the crossings of lines of different families need to be looked at one by one.
+    dx = segments[:, 2] - segments[:, 0]
+    dy = segments[:, 3] - segments[:, 1]
+    family = np.select([dy == 0, dx == 0, np.sign(dx) == np.sign(dy)], [0, 1, 2], 3)
+    pieces = [family_pieces(segments[family == f], f) for f in range(len(FAMILIES))]
+
+    total = 0
+    for line, lo, hi, coverage in pieces:
+        total += int((hi - lo + 1)[coverage >= min_dangerous].sum())
+
+    # (x, y, family, coverage) of every crossing, a point where 3 or 4 families cross shows up in several pairs
+    points = []
+    for f in range(len(FAMILIES)):
+        for g in range(f + 1, len(FAMILIES)):
+            x, y, cov_f, cov_g = crossings(f, pieces[f], g, pieces[g])
+            points.append(np.stack((x, y, np.full_like(x, f), cov_f), axis=1))
+            points.append(np.stack((x, y, np.full_like(x, g), cov_g), axis=1))
+    points = np.unique(np.concatenate(points), axis=0)
+    if len(points) == 0:
+        return total
+
+    cells, inverse = np.unique(points[:, :2], axis=0, return_inverse=True)
+    inverse = inverse.ravel()
+    coverage = np.bincount(inverse, weights=points[:, 3], minlength=len(cells))
+    counted = np.bincount(inverse, weights=points[:, 3] >= min_dangerous, minlength=len(cells))
+    # Those cells were counted once per family that is dangerous on its own, but count once if dangerous at all
+    return total - int(counted.sum()) + int(np.count_nonzero(coverage >= min_dangerous))
+
+
+def choose_engine(segments: np.ndarray) -> str:
+    # A map pays for its whole bounding box, the sparse counter for every covered cell (and a sort), the sweep for
+    # every pair of segments in different directions
+    if len(segments) == 0:
+        return "dense"
+    area = (int(np.ptp(segments[:, [0, 2]])) + 1) * (int(np.ptp(segments[:, [1, 3]])) + 1)
+    total_length = int(segment_lengths(segments).sum())
+    if area <= SPARSE_RATIO * total_length:
+        if area <= DENSE_MAX_CELLS:
+            return "dense"
+        if area <= TILED_MAX_CELLS:
+            return "tiled"
+    if total_length <= SPARSE_MAX_CELLS:
+        return "sparse"
+    return "sweep"
+
+
+def find_danger(source: Source, allow_diagonal=False, min_dangerous: int = 2, engine: Optional[str] = None) -> int:
+    segments, _, _ = parse_input(source, allow_diagonal)
+    engine = engine or choose_engine(segments)
+    if engine == "sparse":
+        return count_dangerous_sparse(segments, min_dangerous)
+    if engine == "sweep":
+        return count_dangerous_sweep(segments, min_dangerous)
+    if engine not in ("dense", "tiled"):
+        raise ValueError(f"Unknown engine {engine}")
+
+    if len(segments) == 0:
+        return 0
+    # Only the bounding box is drawn, coordinates in the millions don't need a map from the origin
+    offset = np.minimum(segments[:, :2].min(axis=0), segments[:, 2:].min(axis=0))
+    segments = segments - np.tile(offset, 2)
+    if engine == "dense":
+        return count_dangerous(draw_lines(segments), min_dangerous)
+
+    with tempfile.TemporaryDirectory() as directory:
+        arr = draw_lines_tiled(segments, os.path.join(directory, "vents.npy"))
+        count = count_dangerous(arr, min_dangerous)
+        # The file can only be removed once it is no longer mapped
+        del arr
+    return count
+
+
+def test_part_1(data_dir: str = "./data"):
+    solution = find_danger(f"{data_dir}/example.txt")
     correct = 5
     assert correct == solution, f"{correct} != {solution}"
 
 
-def part_1():
-    solution = find_danger("./data/input.txt")
+def part_1(data_dir: str = "./data"):
+    solution = find_danger(f"{data_dir}/input.txt")
     print("Solution part 1:")
     print(solution)
 
 
-def test_part_2():
-    solution = find_danger("./data/example.txt", allow_diagonal=True)
+def test_part_2(data_dir: str = "./data"):
+    solution = find_danger(f"{data_dir}/example.txt", allow_diagonal=True)
     correct = 12
     assert correct == solution, f"{correct} != {solution}"
 
+    for engine in ("sparse", "sweep", "tiled"):
+        solution = find_danger(f"{data_dir}/example.txt", allow_diagonal=True, engine=engine)
+        assert correct == solution, f"{engine}: {correct} != {solution}"
+
 
-def part_2():
-    solution = find_danger("./data/input.txt", allow_diagonal=True)
+def part_2(data_dir: str = "./data"):
+    solution = find_danger(f"{data_dir}/input.txt", allow_diagonal=True)
     print("Solution part 2:")
     print(solution)
 
 
 if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        # e.g. zcat vents.gz | python main.py - diagonal
+        print(find_danger(sys.argv[1], allow_diagonal=sys.argv[2:] == ["diagonal"]))
+        sys.exit()
+
     test_part_1()
     part_1()
     print()
@@ -1,4 +1,6 @@
-from typing import List
+from typing import List, Optional
+
+from cache import cached
 
 
 def parse_input(path: str) -> List[int]:
@@ -9,44 +11,112 @@ def parse_input(path: str) -> List[int]:
     return state
 
 
-def growth(initial_state: List[int], days: int, reset_timer=6, spawn_timer=8) -> int:
-    state_count = {k: 0 for k in range(max(reset_timer, spawn_timer) + 1)}
+Matrix = List[List[int]]
+
+
+def transition_matrix(n_timers: int, reset_timer=6, spawn_timer=8) -> Matrix:
+    # m[i][j]: the fish with timer i that a fish with timer j turns into after one day
+    m = [[0] * n_timers for _ in range(n_timers)]
+    for timer in range(1, n_timers):
+        m[timer - 1][timer] = 1
+    m[reset_timer][0] += 1
+    m[spawn_timer][0] += 1
+    return m
+
+
+def mat_mul(a: Matrix, b: Matrix, modulo: Optional[int] = None) -> Matrix:
+    columns = list(zip(*b))
+    product = [[sum(x * y for x, y in zip(row, column)) for column in columns] for row in a]
+    if modulo is not None:
+        product = [[v % modulo for v in row] for row in product]
+    return product
+
+
+def vec_mul(v: List[int], m: Matrix, modulo: Optional[int] = None) -> List[int]:
+    product = [sum(x * y for x, y in zip(v, column)) for column in zip(*m)]
+    return product if modulo is None else [x % modulo for x in product]
+
+
+def per_fish_counts(horizons: List[int], n_timers: int, reset_timer=6, spawn_timer=8,
+                    modulo: Optional[int] = None) -> List[List[int]]:
+    # For every horizon, the number of fish a single fish of every timer grows into: ones @ M^days. The horizons
+    # are visited in increasing order and every step multiplies with the squares M, M^2, M^4, ... of the binary
+    # representation of the difference, which are shared by all steps. So O(log max(horizons)) matrix products
+    # plus a cheap vector product per horizon.
+    squares = [transition_matrix(n_timers, reset_timer, spawn_timer)]
+    counts = {}
+    current, per_fish = 0, [1] * n_timers
+    for horizon in sorted(set(horizons)):
+        step, bit = horizon - current, 0
+        while step:
+            if bit == len(squares):
+                squares.append(mat_mul(squares[-1], squares[-1], modulo))
+            if step & 1:
+                per_fish = vec_mul(per_fish, squares[bit], modulo)
+            step >>= 1
+            bit += 1
+        current = horizon
+        counts[horizon] = per_fish
+    return [counts[horizon] for horizon in horizons]
+
+
+def histogram(initial_state: List[int], n_timers: int) -> List[int]:
+    counts = [0] * n_timers
     for s in initial_state:
-        state_count[s] += 1
+        counts[s] += 1
+    return counts
+
+
+def growth_table(histograms: List[List[int]], horizons: List[int], reset_timer=6, spawn_timer=8,
+                 modulo: Optional[int] = None) -> List[List[int]]:
+    # table[school][i]: the size of the school with the given timer histogram after horizons[i] days. The model is
+    # linear, so the per fish counts are computed once per horizon and reused for every school.
+    n_timers = max(reset_timer + 1, spawn_timer + 1, *(len(h) for h in histograms))
+    per_fish = per_fish_counts(horizons, n_timers, reset_timer, spawn_timer, modulo)
 
-    for _ in range(days):
-        new_state_count = {k: 0 for k in range(max(reset_timer, spawn_timer) + 1)}
-        for days, count in state_count.items():
-            if days == 0:
-                new_state_count[reset_timer] += count
-                new_state_count[spawn_timer] += count
-            else:
-                new_state_count[days - 1] += count
-        state_count = new_state_count
+    table = []
+    for counts in histograms:
+        row = [sum(count * fish for count, fish in zip(counts, weights)) for weights in per_fish]
+        table.append(row if modulo is None else [v % modulo for v in row])
+    return table
 
-    return sum(state_count.values())
 
+@cached(6)
+def growth(initial_state: List[int], days: int, reset_timer=6, spawn_timer=8, modulo: Optional[int] = None) -> int:
+    # Every fish of the school grows independently. With modulo the count is only kept modulo that, which keeps
+    # the numbers small for horizons where the exact count has millions of digits.
+    n_timers = max(reset_timer, spawn_timer, *initial_state) + 1
+    return growth_table([histogram(initial_state, n_timers)], [days], reset_timer, spawn_timer, modulo)[0][0]
 
-def test_part_1():
-    solution = growth(parse_input("./data/example.txt"), 80)
+
+def test_part_1(data_dir: str = "./data"):
+    solution = growth(parse_input(f"{data_dir}/example.txt"), 80, bypass_cache=True)
     correct = 5934
     assert correct == solution, f"{solution} != {correct}"
 
 
-def part_1():
-    solution = growth(parse_input("./data/input.txt"), 80)
+def part_1(data_dir: str = "./data"):
+    solution = growth(parse_input(f"{data_dir}/input.txt"), 80)
     print("Solution part 1:")
     print(solution)
 
 
-def test_part_2():
-    solution = growth(parse_input("./data/example.txt"), 256)
+def test_part_2(data_dir: str = "./data"):
+    solution = growth(parse_input(f"{data_dir}/example.txt"), 256, bypass_cache=True)
     correct = 26984457539
     assert correct == solution, f"{correct} != {solution}"
 
+    solution = growth(parse_input(f"{data_dir}/example.txt"), 256, modulo=10 ** 6, bypass_cache=True)
+    assert correct % 10 ** 6 == solution, f"{correct % 10 ** 6} != {solution}"
+
+    schools = [histogram(parse_input(f"{data_dir}/example.txt"), 9), histogram([3], 9)]
+    table = growth_table(schools, [256, 18, 80])
+    correct = [[26984457539, 26, 5934], [5217223242, 5, 1154]]
+    assert correct == table, f"{correct} != {table}"
+
 
-def part_2():
-    solution = growth(parse_input("./data/input.txt"), 256)
+def part_2(data_dir: str = "./data"):
+    solution = growth(parse_input(f"{data_dir}/input.txt"), 256)
     print("Solution part 2:")
     print(solution)
 
@@ -37,26 +37,26 @@ def cheapest_position_cost_exp(positions: List[int]) -> int:
     return np.min(np.sum(arr, axis=0))
 
 
-def test_part_1():
-    solution = cheapest_position_cost(parse_input("./data/example.txt"))
+def test_part_1(data_dir: str = "./data"):
+    solution = cheapest_position_cost(parse_input(f"{data_dir}/example.txt"))
     correct = 37
     assert correct == solution, f"{correct} != {solution}"
 
 
-def part_1():
-    solution = cheapest_position_cost(parse_input("./data/input.txt"))
+def part_1(data_dir: str = "./data"):
+    solution = cheapest_position_cost(parse_input(f"{data_dir}/input.txt"))
     print("Solution part 1:")
     print(solution)
 
 
-def test_part_2():
-    solution = cheapest_position_cost_exp(parse_input("./data/example.txt"))
+def test_part_2(data_dir: str = "./data"):
+    solution = cheapest_position_cost_exp(parse_input(f"{data_dir}/example.txt"))
     correct = 168
     assert correct == solution, f"{correct} != {solution}"
 
 
-def part_2():
-    solution = cheapest_position_cost_exp(parse_input("./data/input.txt"))
+def part_2(data_dir: str = "./data"):
+    solution = cheapest_position_cost_exp(parse_input(f"{data_dir}/input.txt"))
     print("Solution part 2:")
     print(solution)
 
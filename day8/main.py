@@ -1,8 +1,11 @@
 from typing import List, Tuple, Iterable
 from collections import Counter
-from constraint import Problem, InSetConstraint
 import itertools as it
 
+from lazy import lazy_import
+
+constraint = lazy_import("constraint")
+
 
 #  dddd
 # e    a
@@ -46,8 +49,8 @@ def count_decoded_output(lines):
     return counter
 
 
-def test_part_1():
-    lines = parse_input("./data/example.txt")
+def test_part_1(data_dir: str = "./data"):
+    lines = parse_input(f"{data_dir}/example.txt")
     counter = count_decoded_output(lines)
 
     solution = counter[1] + counter[4] + counter[7] + counter[8]
@@ -55,8 +58,8 @@ def test_part_1():
     assert correct == solution, f"{correct} != {solution}"
 
 
-def part_1():
-    lines = parse_input("./data/input.txt")
+def part_1(data_dir: str = "./data"):
+    lines = parse_input(f"{data_dir}/input.txt")
     counter = count_decoded_output(lines)
 
     solution = counter[1] + counter[4] + counter[7] + counter[8]
@@ -64,11 +67,11 @@ def part_1():
     print(solution)
 
 
-def initialize_constraint_problem() -> Problem:
+def initialize_constraint_problem() -> "constraint.Problem":
     def intersection_is_length(a: Iterable, b: Iterable, length: int) -> bool:
         return len(set(a).intersection(set(b))) == length
 
-    problem = Problem()
+    problem = constraint.Problem()
 
     # Add per digit all possible permutations of segments
     letters = "abcdefg"
@@ -150,11 +153,11 @@ def initialize_constraint_problem() -> Problem:
     return problem
 
 
-def add_problem_data_constraint(problem: Problem, data: List[str]):
-    problem.addConstraint(InSetConstraint(set(data)))
+def add_problem_data_constraint(problem: "constraint.Problem", data: List[str]):
+    problem.addConstraint(constraint.InSetConstraint(set(data)))
 
 
-def decode_problem(problem: Problem, encoded: List[str]) -> int:
+def decode_problem(problem: "constraint.Problem", encoded: List[str]) -> int:
     decode_dict = {}
     for s in problem.getSolutions():
         for k, v in s.items():
@@ -168,8 +171,8 @@ def decode_problem(problem: Problem, encoded: List[str]) -> int:
     return sum([d * 10**i for i, d in enumerate(digits[::-1])])
 
 
-def test_part_2():
-    lines = parse_input("./data/example.txt")
+def test_part_2(data_dir: str = "./data"):
+    lines = parse_input(f"{data_dir}/example.txt")
     solution = []
     for line in lines:
         inp, outp = line
@@ -182,8 +185,8 @@ def test_part_2():
     assert correct == solution, f"{correct} != {solution}"
 
 
-def part_2():
-    lines = parse_input("./data/input.txt")
+def part_2(data_dir: str = "./data"):
+    lines = parse_input(f"{data_dir}/input.txt")
     solution = []
     for line in lines:
         inp, outp = line
@@ -1,80 +1,92 @@
-from typing import Tuple, List, Set
+import os
+import tempfile
+from typing import Tuple, List, Set, Optional
 
 import numpy as np
-from util import Colors
+from util import load_digit_grid, render, rendering_enabled, grid_neighbours, neighbours_of, neighbour_reduce
 
 
 def parse_input(path: str) -> np.ndarray:
-    with open(path) as f:
-        data = []
-        while line := f.readline():
-            data.append(list(map(int, list(line.strip()))))
-        return np.array(data)
+    return load_digit_grid(path)
 
 
 def local_minimum(data: np.ndarray) -> np.ndarray:
-    mask = []
-    for y, row in enumerate(data):
-        mask.append([])
-        for x, val in enumerate(row):
-            a = val < data[y - 1, x] if y > 0 else True
-            b = val < data[y + 1, x] if y < data.shape[0] - 1 else True
-            d = val < data[y, x - 1] if x > 0 else True
-            c = val < data[y, x + 1] if x < data.shape[1] - 1 else True
-            mask[-1].append(a and b and c and d)
-    return np.array(mask)
+    # Outside of the map counts as higher than everything
+    fill = np.iinfo(data.dtype).max if data.dtype.kind in "iu" else np.inf
+    return data < neighbour_reduce(data, np.minimum, fill=fill, connectivity=4)
 
 
 def get_risk(data: np.ndarray, mask: np.ndarray) -> int:
     return np.sum(data[mask] + 1)
 
 
-def test_part_1():
-    data = parse_input("./data/example.txt")
+def test_part_1(data_dir: str = "./data"):
+    data = parse_input(f"{data_dir}/example.txt")
     mask = local_minimum(data)
     solution = get_risk(data, mask)
     correct = 15
     assert correct == solution, f"{correct} != {solution}"
 
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "grid.txt")
+
+        # \r\n line endings load the same digits
+        with open(f"{data_dir}/example.txt", "rb") as f, open(path, "wb") as grid_file:
+            grid_file.write(f.read().replace(b"\r\n", b"\n").replace(b"\n", b"\r\n"))
+        assert np.array_equal(data, parse_input(path)), f"{data} != {parse_input(path)}"
+
+        # Rows of unequal length (with the right total length) and other characters than digits are no grid
+        for content in [b"12\n345\n6\n", b"12\n3a\n"]:
+            with open(path, "wb") as grid_file:
+                grid_file.write(content)
+            try:
+                parse_input(path)
+            except ValueError:
+                continue
+            raise AssertionError(f"{content} loaded as a grid")
+
 
-def part_1():
-    data = parse_input("./data/input.txt")
+def part_1(data_dir: str = "./data"):
+    data = parse_input(f"{data_dir}/input.txt")
     solution = get_risk(data, local_minimum(data))
     print("Solution part 1:")
     print(solution)
 
 
-def breath_first_search(data: np.ndarray, rooty: int, rootx: int) -> Set[Tuple[int, int]]:
-    queue = []
-    root = (rooty, rootx)
-    explored = {root}
-    queue.append(root)
+def breath_first_search(data: np.ndarray, rooty: int, rootx: int,
+                        explored: Optional[np.ndarray] = None) -> Set[Tuple[int, int]]:
+    # Level by level over the flat cell indices, a whole frontier at a time. explored (flat, bool) can be shared
+    # between searches on the same map, so a search only costs the size of its basin.
+    indptr, indices = grid_neighbours(data.shape, 4)
+    flat = data.ravel()
+    if explored is None:
+        explored = np.zeros(flat.size, dtype=bool)
 
-    while queue:
-        vy, vx = queue.pop(0)
+    root = rooty * data.shape[1] + rootx
+    explored[root] = True
+    frontier = np.array([root])
+    basin = [frontier]
 
-        tx, ty = vx, vy + 1
-        bx, by = vx, vy - 1
-        lx, ly = vx - 1, vy
-        rx, ry = vx + 1, vy
+    while frontier.size:
+        candidates = neighbours_of(indptr, indices, frontier)
+        candidates = np.unique(candidates[(flat[candidates] < 9) & ~explored[candidates]])
+        explored[candidates] = True
+        basin.append(candidates)
+        frontier = candidates
 
-        for x, y in [(tx, ty), (bx, by), (lx, ly), (rx, ry)]:
-            if x < 0 or x >= data.shape[1] or y < 0 or y >= data.shape[0]:
-                continue
-            if data[y, x] < 9 and not (y, x) in explored:
-                explored.add((y, x))
-                queue.append((y, x))
-    return explored
+    ys, xs = np.divmod(np.concatenate(basin), data.shape[1])
+    return set(zip(ys.tolist(), xs.tolist()))
 
 
 def get_basins(data: np.ndarray, mask: np.ndarray) -> List[List[Tuple[int, int]]]:
     basins = []
-    for point in np.argwhere(mask):
-        if any([tuple(point) in basin for basin in basins]):
+    explored = np.zeros(data.size, dtype=bool)
+    for y, x in np.argwhere(mask):
+        if explored[y * data.shape[1] + x]:
             # overlapping basins
             continue
 
-        basin_coords = breath_first_search(data, *point)
+        basin_coords = breath_first_search(data, y, x, explored)
         basins.append(list(basin_coords))
 
     return basins
@@ -90,35 +102,21 @@ def get_prod_largest_n(sizes: List[int], n: int) -> int:
 
 
 def print_basins(data: np.ndarray, basins: List[List[Tuple[int, int]]]):
-    masks = []
-    for basin in basins:
-        masks.append(np.zeros(data.shape, dtype=bool))
-        for y, x in basin:
-            masks[-1][y, x] = True
-
-    colors = [Colors.fgBlue, Colors.fgRed, Colors.fgCyan, Colors.fgGreen,
-              Colors.fgBrightBlue, Colors.fgBrightRed, Colors.fgBrightCyan, Colors.fgBrightGreen,
-              Colors.fgBrightMagenta, Colors.fgMagenta, Colors.fgYellow, Colors.fgBrightYellow]
-
-    for y in range(data.shape[0]):
-        for x in range(data.shape[1]):
-            printed = False
-            for i, mask in enumerate(masks):
-                color = colors[i % len(colors)]
-
-                if mask[y, x]:
-                    printed = True
-                    print(f"{color}{data[y,x]}{Colors.reset}", end='')
-
-            if data[y, x] == 9:
-                print(".", end="")
-            elif not printed:
-                print({data[y, x]}, end='')
-        print()
-
-
-def test_part_2():
-    data = parse_input("./data/example.txt")
+    if not rendering_enabled():
+        return
+
+    colors = np.full(data.shape, -1, dtype=np.int64)
+    for i, basin in enumerate(basins):
+        if basin:
+            ys, xs = zip(*basin)
+            colors[ys, xs] = i
+
+    chars = np.array(list("012345678."))[data]
+    render(chars, colors)
+
+
+def test_part_2(data_dir: str = "./data"):
+    data = parse_input(f"{data_dir}/example.txt")
     mask = local_minimum(data)
     basins = get_basins(data, mask)
     print_basins(data, basins)
@@ -129,8 +127,8 @@ def test_part_2():
     assert correct == solution, f"{correct} != {solution}"
 
 
-def part_2():
-    data = parse_input("./data/input.txt")
+def part_2(data_dir: str = "./data"):
+    data = parse_input(f"{data_dir}/input.txt")
     mask = local_minimum(data)
     basins = get_basins(data, mask)
     print_basins(data, basins)
@@ -0,0 +1,295 @@
+import argparse
+import random
+import string
+import sys
+from typing import TextIO, Callable, Dict, List, Tuple
+
+# Every generator writes a valid puzzle input of the given size to an open text file.
+# The meaning of size differs per day, see the comment above each generator.
+
+
+# size: number of soundings
+def generate_day1(f: TextIO, size: int, rng: random.Random):
+    depth = rng.randint(100, 200)
+    for _ in range(size):
+        depth = max(0, depth + rng.randint(-20, 30))
+        f.write(f"{depth}\n")
+
+
+# size: number of commands
+def generate_day2(f: TextIO, size: int, rng: random.Random):
+    for _ in range(size):
+        direction = rng.choice(("forward", "down", "up"))
+        f.write(f"{direction} {rng.randint(1, 9)}\n")
+
+
+def _report_lines(n: int, width: int, rng: random.Random) -> List[str]:
+    # Every group of more than one line has both bit values in its next column, otherwise the
+    # oxygen/CO2 bit criteria can filter out every remaining line
+    if n == 1:
+        return ["".join(rng.choices("01", k=width))]
+
+    half = 2 ** (width - 1)
+    ones = rng.randint(max(1, n - half), min(n - 1, half))
+    lines = ["1" + line for line in _report_lines(ones, width - 1, rng)]
+    lines += ["0" + line for line in _report_lines(n - ones, width - 1, rng)]
+    return lines
+
+
+# size: number of report lines
+def generate_day3(f: TextIO, size: int, rng: random.Random, width: int = 12):
+    width = max(width, (size - 1).bit_length())
+    lines = _report_lines(size, width, rng)
+    rng.shuffle(lines)
+    for line in lines:
+        f.write(line + "\n")
+
+
+# size: number of boards
+def generate_day4(f: TextIO, size: int, rng: random.Random, board_size: int = 5, max_value: int = 100):
+    max_value = max(max_value, board_size ** 2)
+
+    # All values are drawn, so every board wins eventually
+    draws = list(range(max_value))
+    rng.shuffle(draws)
+    f.write(",".join(map(str, draws)) + "\n")
+
+    for _ in range(size):
+        f.write("\n")
+        values = rng.sample(range(max_value), board_size ** 2)
+        for row in range(board_size):
+            f.write(" ".join(f"{v:2d}" for v in values[row * board_size:(row + 1) * board_size]) + "\n")
+
+
+# size: number of line segments
+def generate_day5(f: TextIO, size: int, rng: random.Random, side: int = 1000):
+    for _ in range(size):
+        x1, y1 = rng.randrange(side), rng.randrange(side)
+        kind = rng.randrange(3)
+        if kind == 0:
+            x2, y2 = rng.randrange(side), y1
+        elif kind == 1:
+            x2, y2 = x1, rng.randrange(side)
+        else:
+            length = rng.randrange(side)
+            dx, dy = rng.choice((-1, 1)), rng.choice((-1, 1))
+            length = min(length, x1 if dx < 0 else side - 1 - x1, y1 if dy < 0 else side - 1 - y1)
+            x2, y2 = x1 + dx * length, y1 + dy * length
+        f.write(f"{x1},{y1} -> {x2},{y2}\n")
+
+
+# size: number of lanternfish
+def generate_day6(f: TextIO, size: int, rng: random.Random):
+    f.write(",".join(str(rng.randint(1, 5)) for _ in range(size)) + "\n")
+
+
+# size: number of crabs
+def generate_day7(f: TextIO, size: int, rng: random.Random, max_position: int = 2000):
+    f.write(",".join(str(rng.randrange(max_position)) for _ in range(size)) + "\n")
+
+
+DIGIT_SEGMENTS = ["abcefg", "cf", "acdeg", "acdfg", "bcdf", "abdfg", "abdefg", "acf", "abcdefg", "abcdfg"]
+
+
+# size: number of displays
+def generate_day8(f: TextIO, size: int, rng: random.Random):
+    for _ in range(size):
+        wiring = dict(zip("abcdefg", rng.sample("abcdefg", 7)))
+
+        def encode(digit: int) -> str:
+            segments = [wiring[s] for s in DIGIT_SEGMENTS[digit]]
+            rng.shuffle(segments)
+            return "".join(segments)
+
+        patterns = [encode(d) for d in rng.sample(range(10), 10)]
+        output = [encode(rng.randrange(10)) for _ in range(4)]
+        f.write(f"{' '.join(patterns)} | {' '.join(output)}\n")
+
+
+# size: side of the square grid
+def generate_digit_grid(f: TextIO, size: int, rng: random.Random, low: int = 0, high: int = 9):
+    for _ in range(size):
+        f.write("".join(str(rng.randint(low, high)) for _ in range(size)) + "\n")
+
+
+# size: side of the heightmap
+def generate_day9(f: TextIO, size: int, rng: random.Random):
+    generate_digit_grid(f, size, rng)
+
+
+BRACKETS = {"(": ")", "[": "]", "{": "}", "<": ">"}
+
+
+# size: number of navigation lines
+def generate_day10(f: TextIO, size: int, rng: random.Random, length: int = 100, max_depth: int = 20):
+    for _ in range(size):
+        stack = []
+        line = []
+        corrupt_at = rng.randrange(length) if rng.random() < 0.5 else None
+        for i in range(length):
+            if stack and (len(stack) >= max_depth or rng.random() < 0.45):
+                closer = BRACKETS[stack.pop()]
+                if i == corrupt_at:
+                    closer = rng.choice([c for c in BRACKETS.values() if c != closer])
+                line.append(closer)
+            else:
+                opener = rng.choice(list(BRACKETS))
+                stack.append(opener)
+                line.append(opener)
+
+        if corrupt_at is None and not stack:
+            # Make sure uncorrupted lines are incomplete
+            line.append(rng.choice(list(BRACKETS)))
+        f.write("".join(line) + "\n")
+
+
+# size: side of the octopus grid
+def generate_day11(f: TextIO, size: int, rng: random.Random):
+    generate_digit_grid(f, size, rng)
+
+
+# size: number of small caves
+def generate_day12(f: TextIO, size: int, rng: random.Random, n_large: int = 2, edges_per_cave: int = 2):
+    small = ["start", "end"] + [f"s{''.join(rng.choices(string.ascii_lowercase, k=2))}{i}" for i in range(size)]
+    large = [f"L{''.join(rng.choices(string.ascii_uppercase, k=2))}{i}".upper() for i in range(n_large)]
+
+    # Large caves are never connected to each other, otherwise there would be infinitely many paths
+    edges = set()
+    for cave in small:
+        for _ in range(edges_per_cave):
+            other = rng.choice(small + large)
+            if other != cave:
+                edges.add(tuple(sorted((cave, other))))
+    for cave in large:
+        edges.add(tuple(sorted((cave, rng.choice(small)))))
+
+    for a, b in sorted(edges):
+        f.write(f"{a}-{b}\n")
+
+
+# size: number of dots
+def generate_day13(f: TextIO, size: int, rng: random.Random, n_folds: int = 6):
+    width = height = 2 ** (n_folds // 2 + 5) * 2 + 1
+    folds: List[Tuple[str, int]] = []
+    w, h = width, height
+    for i in range(n_folds):
+        if i % 2:
+            folds.append(("x", w // 2))
+            w //= 2
+        else:
+            folds.append(("y", h // 2))
+            h //= 2
+
+    def on_fold_line(x: int, y: int) -> bool:
+        for axis, position in folds:
+            v = x if axis == "x" else y
+            if v == position:
+                return True
+            if v > position:
+                v = 2 * position - v
+            if axis == "x":
+                x = v
+            else:
+                y = v
+        return False
+
+    dots = set()
+    while len(dots) < size:
+        x, y = rng.randrange(width), rng.randrange(height)
+        if not on_fold_line(x, y):
+            dots.add((x, y))
+
+    for x, y in dots:
+        f.write(f"{x},{y}\n")
+    f.write("\n")
+    for axis, position in folds:
+        f.write(f"fold along {axis}={position}\n")
+
+
+# size: length of the polymer template
+def generate_day14(f: TextIO, size: int, rng: random.Random, n_elements: int = 10):
+    elements = string.ascii_uppercase[:n_elements]
+    f.write("".join(rng.choices(elements, k=size)) + "\n")
+    f.write("\n")
+    for a in elements:
+        for b in elements:
+            f.write(f"{a}{b} -> {rng.choice(elements)}\n")
+
+
+# size: side of the risk grid
+def generate_day15(f: TextIO, size: int, rng: random.Random):
+    generate_digit_grid(f, size, rng, low=1)
+
+
+def _encode_packet(rng: random.Random, depth: int) -> str:
+    version = f"{rng.randrange(8):03b}"
+    if depth == 0:
+        value = f"{rng.randrange(2 ** 12):b}"
+        value = "0" * (-len(value) % 4) + value
+        groups = [value[i:i + 4] for i in range(0, len(value), 4)]
+        return version + "100" + "".join(("1" if i < len(groups) - 1 else "0") + g for i, g in enumerate(groups))
+
+    type_id = rng.choice((0, 1, 2, 3, 5, 6, 7))
+    n_sub_packets = 2 if type_id >= 5 else rng.randint(1, 3)
+    sub_packets = [_encode_packet(rng, depth - 1) for _ in range(n_sub_packets)]
+    if rng.random() < 0.5:
+        header = "0" + f"{sum(map(len, sub_packets)):015b}"
+    else:
+        header = "1" + f"{n_sub_packets:011b}"
+    return version + f"{type_id:03b}" + header + "".join(sub_packets)
+
+
+# size: depth of the packet tree
+def generate_day16(f: TextIO, size: int, rng: random.Random):
+    bits = _encode_packet(rng, size)
+    bits += "0" * (-len(bits) % 4)
+    f.write("".join(f"{int(bits[i:i + 4], 2):X}" for i in range(0, len(bits), 4)) + "\n")
+
+
+# size: scale of the target area
+def generate_day17(f: TextIO, size: int, rng: random.Random):
+    x_min = rng.randint(2 * size, 3 * size)
+    x_max = x_min + rng.randint(size, 2 * size)
+    y_min = -rng.randint(2 * size, 3 * size)
+    y_max = y_min + rng.randint(size // 2, size)
+    f.write(f"target area: x={x_min}..{x_max}, y={y_min}..{y_max}\n")
+
+
+GENERATORS: Dict[int, Callable] = {
+    1: generate_day1,
+    2: generate_day2,
+    3: generate_day3,
+    4: generate_day4,
+    5: generate_day5,
+    6: generate_day6,
+    7: generate_day7,
+    8: generate_day8,
+    9: generate_day9,
+    10: generate_day10,
+    11: generate_day11,
+    12: generate_day12,
+    13: generate_day13,
+    14: generate_day14,
+    15: generate_day15,
+    16: generate_day16,
+    17: generate_day17,
+}
+
+
+def generate(path: str, day: int, size: int, seed: int = 0, **kwargs):
+    with open(path, "w") as f:
+        GENERATORS[day](f, size, random.Random(seed), **kwargs)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Write a synthetic puzzle input")
+    parser.add_argument("day", type=int, choices=sorted(GENERATORS))
+    parser.add_argument("size", type=int)
+    parser.add_argument("-o", "--output", help="Output file, defaults to stdout")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.output:
+        generate(args.output, args.day, args.size, args.seed)
+    else:
+        GENERATORS[args.day](sys.stdout, args.size, random.Random(args.seed))
@@ -0,0 +1,116 @@
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+# AOC_INSTRUMENT=1 times the instrumented functions, AOC_INSTRUMENT=alloc also traces their allocations.
+# The decision is made once at import, when disabled @instrument hands back the undecorated function.
+MODE = os.environ.get("AOC_INSTRUMENT", "")
+ENABLED = MODE not in ("", "0")
+TRACE_ALLOCATIONS = MODE == "alloc"
+
+
+class Stats:
+    def __init__(self):
+        self.latencies: List[int] = []
+        self.allocated = 0
+
+    def summary(self) -> Dict:
+        latencies = sorted(self.latencies)
+
+        def percentile(p: float) -> float:
+            return latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] / 1e9 if latencies else 0.
+
+        return {
+            "calls": len(latencies),
+            "total": sum(latencies) / 1e9,
+            "mean": sum(latencies) / len(latencies) / 1e9 if latencies else 0.,
+            "p50": percentile(50),
+            "p90": percentile(90),
+            "p99": percentile(99),
+            "max": latencies[-1] / 1e9 if latencies else 0.,
+            "allocated": self.allocated if TRACE_ALLOCATIONS else None,
+        }
+
+
+_stats: Dict[str, Stats] = defaultdict(Stats)
+# Self time in nanoseconds per call stack, in the folded format flame graph tools read
+_stacks: Dict[str, int] = defaultdict(int)
+_local = threading.local()
+
+
+def _frames() -> List[List]:
+    if not hasattr(_local, "frames"):
+        _local.frames = []
+    return _local.frames
+
+
+def instrument(func: Optional[Callable] = None, *, name: Optional[str] = None) -> Callable:
+    if func is None:
+        return functools.partial(instrument, name=name)
+    if not ENABLED:
+        return func
+
+    name = name or func.__qualname__
+    stats = _stats[name]
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        frames = _frames()
+        # [name, child time]
+        frames.append([name, 0])
+        allocated_before = tracemalloc.get_traced_memory()[0] if TRACE_ALLOCATIONS else 0
+        start = time.perf_counter_ns()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            elapsed = time.perf_counter_ns() - start
+            if TRACE_ALLOCATIONS:
+                stats.allocated += tracemalloc.get_traced_memory()[0] - allocated_before
+            stats.latencies.append(elapsed)
+
+            _stacks[";".join(frame[0] for frame in frames)] += elapsed - frames[-1][1]
+            frames.pop()
+            if frames:
+                frames[-1][1] += elapsed
+
+    return wrapper
+
+
+def report() -> Dict[str, Dict]:
+    return {name: stats.summary() for name, stats in _stats.items() if stats.latencies}
+
+
+def reset():
+    _stats.clear()
+    _stacks.clear()
+
+
+def dump_json(path: str):
+    with open(path, "w") as f:
+        json.dump(report(), f, indent=2)
+
+
+def dump_folded(path: str):
+    # One "outer;inner self_time_in_microseconds" line per stack, e.g. for flamegraph.pl or speedscope
+    with open(path, "w") as f:
+        for stack, self_time in sorted(_stacks.items()):
+            f.write(f"{stack} {self_time // 1000}\n")
+
+
+def dump(prefix: str):
+    dump_json(prefix + ".json")
+    dump_folded(prefix + ".folded")
+
+
+if ENABLED:
+    if TRACE_ALLOCATIONS and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+    if output := os.environ.get("AOC_INSTRUMENT_OUTPUT"):
+        atexit.register(dump, output)
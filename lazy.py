@@ -0,0 +1,67 @@
+import functools
+import importlib.util
+import sys
+from types import ModuleType
+from typing import Callable
+
+
+def lazy_import(name: str) -> ModuleType:
+    # The module is only executed on the first attribute access
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named '{name}'", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
+
+
+class LazyJit:
+    # Stands in for a numba dispatcher until the first call, so numba is only imported when a kernel actually runs
+    def __init__(self, func: Callable, options: dict):
+        functools.update_wrapper(self, func)
+        self._func = func
+        self._options = options
+        self._dispatcher = None
+
+    def _materialize(self):
+        import numba
+
+        # Kernels call each other through module globals, those have to be real dispatchers when numba compiles
+        module_globals = self._func.__globals__
+        for name, value in list(module_globals.items()):
+            if isinstance(value, LazyJit):
+                module_globals[name] = value._jit(numba)
+        return self._jit(numba)
+
+    def _jit(self, numba):
+        if self._dispatcher is None:
+            options = dict(self._options)
+            if options.get("cache") and "." not in self._func.__module__:
+                # Cached kernels are loaded back through their module name, so an entry written while running
+                # `python main.py` (__main__) breaks `import dayN.main` and vice versa. Only cache the latter.
+                options["cache"] = False
+            self._dispatcher = numba.njit(**options)(self._func)
+        return self._dispatcher
+
+    def __call__(self, *args, **kwargs):
+        if self._dispatcher is None:
+            self._materialize()
+        return self._dispatcher(*args, **kwargs)
+
+    def __getattr__(self, item):
+        # e.g. .stats or .signatures of the dispatcher
+        if item.startswith("_"):
+            raise AttributeError(item)
+        if self._dispatcher is None:
+            self._materialize()
+        return getattr(self._dispatcher, item)
+
+
+def lazy_njit(**options) -> Callable[[Callable], LazyJit]:
+    return lambda func: LazyJit(func, options)
@@ -0,0 +1,204 @@
+import argparse
+import ast
+import contextlib
+import io
+import json
+import os
+import re
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, asdict
+from importlib import import_module
+from typing import List, Optional, Tuple
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak RSS is reported as None there
+    resource = None
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+PART_PATTERN = re.compile(r"(test_)?part_\d+")
+
+
+@dataclass
+class PartResult:
+    day: int
+    name: str
+    data_dir: str
+    passed: bool
+    import_time: float
+    wall_time: float
+    cpu_time: float
+    peak_rss_kib: Optional[int]
+    output: str
+    error: Optional[str] = None
+
+
+def day_dir(day: int) -> str:
+    return os.path.join(ROOT, f"day{day}")
+
+
+def data_dir_of(day: int, data_root: Optional[str] = None) -> str:
+    # dayN/data in the repository, or dayN in data_root, e.g. a directory with larger inputs
+    return os.path.join(data_root, f"day{day}") if data_root else os.path.join(day_dir(day), "data")
+
+
+def find_days() -> List[int]:
+    days = []
+    for name in os.listdir(ROOT):
+        m = re.fullmatch(r"day(\d+)", name)
+        if m and os.path.isfile(os.path.join(ROOT, name, "main.py")):
+            days.append(int(m.group(1)))
+    return sorted(days)
+
+
+def find_parts(day: int) -> List[str]:
+    # Parse instead of import, importing would pay for every day's dependencies (and numba compiles) up front
+    with open(os.path.join(day_dir(day), "main.py")) as f:
+        tree = ast.parse(f.read())
+
+    parts = []
+    for node in tree.body:
+        if not isinstance(node, ast.FunctionDef) or not PART_PATTERN.fullmatch(node.name):
+            continue
+        args = node.args
+        if len(args.args) + len(args.posonlyargs) > len(args.defaults):
+            # Parameterized example tests (e.g. day16) can't be run without their arguments
+            continue
+        parts.append(node.name)
+
+    # test_part_1, part_1, test_part_2, part_2, ...
+    return sorted(parts, key=lambda name: (int(name.rsplit("_", 1)[1]), not name.startswith("test_")))
+
+
+def get_peak_rss_kib() -> Optional[int]:
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        # bytes on macOS, KiB everywhere else
+        peak //= 1024
+    return peak
+
+
+def run_part(day: int, name: str, data_dir: str, instrument_dir: Optional[str] = None) -> PartResult:
+    if ROOT not in sys.path:
+        sys.path.insert(0, ROOT)
+
+    output = io.StringIO()
+    error = None
+    import_time = wall_time = cpu_time = 0.
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        try:
+            start = time.perf_counter()
+            module = import_module(f"day{day}.main")
+            import_time = time.perf_counter() - start
+
+            func = getattr(module, name)
+            start_wall, start_cpu = time.perf_counter(), time.process_time()
+            try:
+                func(data_dir=data_dir)
+            finally:
+                wall_time = time.perf_counter() - start_wall
+                cpu_time = time.process_time() - start_cpu
+        except BaseException:
+            error = traceback.format_exc()
+
+    if instrument_dir is not None:
+        # Pool workers exit without running atexit handlers, so dump explicitly
+        import instrument
+        instrument.dump(os.path.join(instrument_dir, f"day{day}_{name}"))
+
+    return PartResult(day, name, data_dir, error is None, import_time, wall_time, cpu_time, get_peak_rss_kib(),
+                      output.getvalue(), error)
+
+
+def run_all(days: List[int], jobs: Optional[int] = None, tests_only=False, parts_only=False,
+            instrument_dir: Optional[str] = None, data_root: Optional[str] = None) -> List[PartResult]:
+    tasks: List[Tuple[int, str]] = []
+    for day in days:
+        for name in find_parts(day):
+            is_test = name.startswith("test_")
+            if (tests_only and not is_test) or (parts_only and is_test):
+                continue
+            tasks.append((day, name))
+
+    results = []
+    # One task per process, so every part gets its own peak RSS and a cold import
+    with ProcessPoolExecutor(max_workers=jobs, max_tasks_per_child=1) as pool:
+        futures = [pool.submit(run_part, day, name, data_dir_of(day, data_root), instrument_dir) for day, name in tasks]
+        for future in as_completed(futures):
+            result = future.result()
+            print(f"day{result.day}.{result.name}: {'ok' if result.passed else 'FAILED'} "
+                  f"({result.wall_time:.3f}s)", file=sys.stderr)
+            results.append(result)
+
+    order = {task: i for i, task in enumerate(tasks)}
+    return sorted(results, key=lambda r: order[(r.day, r.name)])
+
+
+def print_table(results: List[PartResult]):
+    print(f"{'day':>4} {'part':<12} {'status':<6} {'import':>9} {'wall':>9} {'cpu':>9} {'peak rss':>12}")
+    for r in results:
+        rss = f"{r.peak_rss_kib / 1024:.1f} MiB" if r.peak_rss_kib is not None else "-"
+        print(f"{r.day:>4} {r.name:<12} {'ok' if r.passed else 'FAIL':<6} {r.import_time:>8.3f}s "
+              f"{r.wall_time:>8.3f}s {r.cpu_time:>8.3f}s {rss:>12}")
+
+    for r in results:
+        if not r.passed:
+            print()
+            print(f"day{r.day}.{r.name} failed:")
+            print(r.error)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run the test_part_*/part_* functions of every day in parallel")
+    parser.add_argument("days", nargs="*", type=int, help="Days to run, defaults to all days")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="Number of worker processes")
+    parser.add_argument("--tests-only", action="store_true", help="Only run the test_part_* functions")
+    parser.add_argument("--parts-only", action="store_true", help="Only run the part_* functions")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    parser.add_argument("--show-output", action="store_true", help="Print the captured output of every part")
+    parser.add_argument("--data-root", metavar="DIR",
+                        help="Read the inputs of day N from DIR/dayN instead of dayN/data")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass the result cache")
+    parser.add_argument("--instrument", metavar="DIR",
+                        help="Instrument the hot functions and write their stats (.json) and stacks (.folded) to DIR")
+    args = parser.parse_args(argv)
+
+    if args.no_cache:
+        # Inherited by the worker processes
+        os.environ["AOC_NO_CACHE"] = "1"
+
+    instrument_dir = None
+    if args.instrument:
+        instrument_dir = os.path.abspath(args.instrument)
+        os.makedirs(instrument_dir, exist_ok=True)
+        os.environ.setdefault("AOC_INSTRUMENT", "1")
+
+    days = args.days or find_days()
+    start = time.perf_counter()
+    data_root = os.path.abspath(args.data_root) if args.data_root else None
+    results = run_all(days, args.jobs, args.tests_only, args.parts_only, instrument_dir, data_root)
+    total = time.perf_counter() - start
+
+    if args.json:
+        print(json.dumps({"total_wall_time": total, "results": [asdict(r) for r in results]}, indent=2))
+    else:
+        print_table(results)
+        if args.show_output:
+            for r in results:
+                print()
+                print(f"day{r.day}.{r.name}:")
+                print(r.output)
+        print()
+        print(f"Total wall time: {total:.3f}s")
+
+    return 0 if all(r.passed for r in results) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,60 @@
+import itertools
+import os
+import subprocess
+import sys
+import tempfile
+from unittest import TestCase, mock
+
+from cache import ResultCache
+from runner import ROOT, find_days
+
+# Seconds a bare `import dayN.main` may take in a fresh interpreter, override with AOC_IMPORT_BUDGET
+IMPORT_BUDGET = float(os.environ.get("AOC_IMPORT_BUDGET", 0.5))
+HEAVY_MODULES = ["numba", "pyparsing", "tqdm", "constraint", "joblib"]
+
+IMPORT_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+import day{day}.main
+print(time.perf_counter() - start)
+print(",".join(m for m in {heavy!r} if m in sys.modules and type(sys.modules[m]).__name__ != "_LazyModule"))
+"""
+
+
+def measure_import(day: int):
+    output = subprocess.run([sys.executable, "-c", IMPORT_SCRIPT.format(day=day, heavy=HEAVY_MODULES)],
+                            cwd=ROOT, capture_output=True, text=True, check=True).stdout.splitlines()
+    loaded = output[1].split(",") if output[1] else []
+    return float(output[0]), loaded
+
+
+class TestImportTime(TestCase):
+    def test_heavy_dependencies_are_lazy(self):
+        for day in find_days():
+            with self.subTest(day=day):
+                _, loaded = measure_import(day)
+                self.assertEqual(loaded, [], f"day{day} loads {loaded} on import")
+
+    def test_import_budget(self):
+        for day in find_days():
+            with self.subTest(day=day):
+                # Best of three, to not fail on a single slow start
+                import_time = min(measure_import(day)[0] for _ in range(3))
+                self.assertLess(import_time, IMPORT_BUDGET, f"day{day} takes {import_time:.3f}s to import")
+
+
+class TestResultCache(TestCase):
+    def test_evicts_least_recently_used(self):
+        with tempfile.TemporaryDirectory() as directory, \
+                mock.patch("cache.time.time", side_effect=itertools.count().__next__):
+            cache = ResultCache(os.path.join(directory, "results.sqlite"), max_bytes=1000)
+            cache.put("a", b"a" * 400)
+            cache.put("b", b"b" * 400)
+            # Reading a makes b the least recently used entry
+            self.assertEqual(cache.get("a"), (True, b"a" * 400))
+
+            cache.put("c", b"c" * 400)
+            self.assertEqual(len(cache), 2)
+            self.assertEqual(cache.get("b"), (False, None))
+            self.assertEqual(cache.get("a"), (True, b"a" * 400))
+            self.assertEqual(cache.get("c"), (True, b"c" * 400))
@@ -1,3 +1,212 @@
+import functools
+import mmap
+import os
+import shutil
+import sys
+from typing import Optional, Union, Iterable, Iterator, IO, List, Tuple, Callable, Sequence
+
+import numpy as np
+
+Source = Union[str, os.PathLike, IO, Iterable[Union[str, bytes]]]
+
+
+def iter_lines(source: Source) -> Iterator[str]:
+    # Lines one at a time from a path ("-" for stdin), a text or binary stream or any iterable of lines, so
+    # solvers can run on piped input (e.g. `zcat input.gz | python main.py -`) in constant memory
+    if isinstance(source, (str, os.PathLike)):
+        if source == "-":
+            yield from iter_lines(sys.stdin.buffer)
+            return
+        with open(source) as f:
+            yield from f
+        return
+
+    for line in source:
+        yield line.decode() if isinstance(line, bytes) else line
+
+
+CHUNK_BYTES = 1 << 24
+
+
+def iter_chunks(source: Source, chunk_bytes: int = CHUNK_BYTES) -> Iterator[bytes]:
+    # Blocks of roughly chunk_bytes that always end on a line boundary, for parsers that work on many lines at once
+    if isinstance(source, (str, os.PathLike)):
+        if source == "-":
+            yield from iter_chunks(sys.stdin.buffer, chunk_bytes)
+            return
+        with open(source, "rb") as f:
+            yield from iter_chunks(f, chunk_bytes)
+        return
+
+    if hasattr(source, "read"):
+        yield from _line_aligned(source.read, chunk_bytes)
+        return
+
+    lines = []
+    size = 0
+    for line in source:
+        line = line.encode() if isinstance(line, str) else line
+        lines.append(line.rstrip(b"\n"))
+        size += len(line) + 1
+        if size >= chunk_bytes:
+            yield b"\n".join(lines) + b"\n"
+            lines = []
+            size = 0
+    if lines:
+        yield b"\n".join(lines) + b"\n"
+
+
+def parse_ints(chunk: bytes, dtype=np.int64) -> np.ndarray:
+    # All whitespace separated integers in chunk. np.fromstring on its own turns a chunk of only whitespace
+    # (e.g. a blank line) into [0].
+    if not chunk.strip():
+        return np.zeros(0, dtype=dtype)
+    return np.fromstring(chunk, dtype=dtype, sep=" ")
+
+
+def _line_aligned(read: Callable[[int], Union[str, bytes]], chunk_bytes: int) -> Iterator[bytes]:
+    carry = b""
+    while block := read(chunk_bytes):
+        block = carry + (block.encode() if isinstance(block, str) else block)
+        cut = block.rfind(b"\n") + 1
+        carry = block[cut:]
+        if cut:
+            yield block[:cut]
+    if carry:
+        yield carry
+
+
+def split_file(path: str, n: int, start: int = 0, end: Optional[int] = None) -> List[Tuple[int, int]]:
+    # n byte ranges [start, end) of about equal size that each start at the beginning of a line, some may be empty.
+    # start has to be the beginning of a line as well.
+    end = os.path.getsize(path) if end is None else end
+    bounds = [start]
+    with open(path, "rb") as f:
+        for i in range(1, n):
+            f.seek(max(start + i * (end - start) // n - 1, bounds[-1]))
+            f.readline()
+            bounds.append(min(max(f.tell(), bounds[-1]), end))
+    bounds.append(end)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+
+def iter_file_range(path: str, start: int, end: int, chunk_bytes: int = CHUNK_BYTES) -> Iterator[bytes]:
+    # iter_chunks for the bytes [start, end) of a file, e.g. one of the ranges of split_file
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start
+
+        def read(n: int) -> bytes:
+            nonlocal remaining
+            block = f.read(min(n, remaining))
+            remaining -= len(block)
+            return block
+
+        yield from _line_aligned(read, chunk_bytes)
+
+
+def load_digit_grid(path: str, dtype=np.uint8, rows: Optional[slice] = None) -> np.ndarray:
+    with open(path, "rb") as f:
+        if f.seek(0, 2) == 0:
+            return np.zeros((0, 0), dtype=dtype)
+
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            end = len(mm)
+            while end > 0 and mm[end - 1] in b"\r\n":
+                end -= 1
+
+            newline = mm.find(b"\n", 0, end)
+            stride = newline + 1 if newline != -1 else end + 1
+            width = newline - (mm[newline - 1] == ord("\r")) if newline > 0 else end
+
+            # The last row has no line ending
+            n_rows = (end + stride - width) // stride
+            if n_rows * stride - (stride - width) != end:
+                raise ValueError(f"{path} is not a grid, rows are of unequal length")
+
+            # View the digits in place, skipping the line endings, so only the selected rows get copied (once)
+            buffer = np.frombuffer(mm, dtype=np.uint8)
+            ending = bytes(mm[width:stride])
+
+            # Equal total length isn't enough, every row has to end where the first one does (b"12\n345\n6")
+            for i, byte in enumerate(ending):
+                if np.any(buffer[width + i:end:stride] != byte):
+                    del buffer
+                    raise ValueError(f"{path} is not a grid, rows are of unequal length")
+
+            view = np.lib.stride_tricks.as_strided(buffer, shape=(n_rows, width), strides=(stride, 1),
+                                                   writeable=False)
+            if rows is not None:
+                view = view[rows]
+            if np.any(view - np.uint8(ord("0")) > 9):
+                del buffer, view
+                raise ValueError(f"{path} is not a grid of digits")
+            grid = view.astype(dtype)
+            grid -= ord("0")
+
+            # The mmap can't be closed while numpy still holds a view on it
+            del buffer, view
+    return grid
+
+
+# (dy, dx) per connectivity, the 8-neighbourhood lists its 4-neighbourhood first
+OFFSETS = {
+    4: ((-1, 0), (1, 0), (0, -1), (0, 1)),
+    8: ((-1, 0), (1, 0), (0, -1), (0, 1), (-1, -1), (-1, 1), (1, -1), (1, 1)),
+}
+
+
+@functools.lru_cache(maxsize=16)
+def grid_neighbours(shape: Tuple[int, int], connectivity: int = 4) -> Tuple[np.ndarray, np.ndarray]:
+    # CSR layout over the flat (row major) cell indices: the neighbours of cell i are
+    # indices[indptr[i]:indptr[i + 1]]. Cached per shape, the arrays are read-only.
+    rows, columns = shape
+    ys, xs = np.divmod(np.arange(rows * columns), columns)
+
+    table = np.full((rows * columns, len(OFFSETS[connectivity])), -1, dtype=np.intp)
+    for i, (dy, dx) in enumerate(OFFSETS[connectivity]):
+        valid = (ys + dy >= 0) & (ys + dy < rows) & (xs + dx >= 0) & (xs + dx < columns)
+        table[valid, i] = (ys[valid] + dy) * columns + xs[valid] + dx
+
+    valid = table >= 0
+    indptr = np.zeros(rows * columns + 1, dtype=np.intp)
+    np.cumsum(valid.sum(axis=1), out=indptr[1:])
+    indices = table[valid]
+
+    indptr.setflags(write=False)
+    indices.setflags(write=False)
+    return indptr, indices
+
+
+def neighbours_of(indptr: np.ndarray, indices: np.ndarray, cells: np.ndarray) -> np.ndarray:
+    # All neighbours of all given flat cells at once (with repeats), gathered from the CSR arrays
+    starts = indptr[cells]
+    counts = indptr[cells + 1] - starts
+    if counts.sum() == 0:
+        return np.zeros(0, dtype=indices.dtype)
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return indices[offsets + np.arange(counts.sum())]
+
+
+def shift(arr: np.ndarray, dy: int, dx: int, fill=0) -> np.ndarray:
+    # out[y, x] = arr[y + dy, x + dx], or fill where that falls outside of arr
+    out = np.full_like(arr, fill)
+    rows, columns = arr.shape
+    out[max(0, -dy):rows - max(0, dy), max(0, -dx):columns - max(0, dx)] = \
+        arr[max(0, dy):rows - max(0, -dy), max(0, dx):columns - max(0, -dx)]
+    return out
+
+
+def neighbour_reduce(arr: np.ndarray, ufunc: Callable = np.minimum, fill=0, connectivity: int = 4) -> np.ndarray:
+    # Stencil over the neighbourhood of every cell, e.g. the smallest neighbour (np.minimum) or the number of
+    # flagged neighbours (np.add on a boolean array). Cells outside of the grid count as fill.
+    offsets = OFFSETS[connectivity]
+    out = shift(arr, *offsets[0], fill=fill)
+    for dy, dx in offsets[1:]:
+        ufunc(out, shift(arr, dy, dx, fill=fill), out=out)
+    return out
+
+
 class Colors:
     reset = "\033[0m"
 
@@ -48,3 +257,43 @@ class Colors:
     fgBrightWhite = "\033[37;1m"
     bgWhite = "\033[47m"
     bgBrightWhite = "\033[47;1m"
+
+
+BASIN_PALETTE = [Colors.fgBlue, Colors.fgRed, Colors.fgCyan, Colors.fgGreen,
+                 Colors.fgBrightBlue, Colors.fgBrightRed, Colors.fgBrightCyan, Colors.fgBrightGreen,
+                 Colors.fgBrightMagenta, Colors.fgMagenta, Colors.fgYellow, Colors.fgBrightYellow]
+
+
+def rendering_enabled() -> bool:
+    # AOC_RENDER=0 turns off all visualisations
+    return os.environ.get("AOC_RENDER", "1") != "0"
+
+
+def render(chars: np.ndarray, colors: Optional[np.ndarray] = None, palette: Sequence[str] = BASIN_PALETTE,
+           max_shape: Optional[Tuple[int, int]] = None, labels: bool = False, file: Optional[IO] = None):
+    # Writes a grid of single characters as one frame. colors holds an index into palette per cell (-1 for
+    # uncoloured). Grids larger than max_shape (default: the terminal) are downsampled by taking every n-th cell.
+    # Visualisations check rendering_enabled() first, render itself always writes.
+    file = file or sys.stdout
+
+    if max_shape is None:
+        columns, rows = shutil.get_terminal_size()
+        max_shape = (max(rows - 1, 1), max(columns - (8 if labels else 0), 1))
+    step_y = -(-chars.shape[0] // max_shape[0])
+    step_x = -(-chars.shape[1] // max_shape[1])
+    chars = chars[::step_y, ::step_x].astype(str)
+
+    if colors is not None:
+        colors = colors[::step_y, ::step_x]
+        codes = np.array(list(palette) + [""])
+        prefix = codes[np.where(colors >= 0, colors % len(palette), len(palette))]
+        suffix = np.where(colors >= 0, Colors.reset, "")
+        chars = np.char.add(np.char.add(prefix, chars), suffix)
+
+    lines = ["".join(row) for row in chars.tolist()]
+    if labels:
+        width = len(str((len(lines) - 1) * step_y))
+        header = "".join(str(x % 10) for x in range(0, chars.shape[1] * step_x, step_x))
+        lines = [" " * (width + 1) + header] + [f"{i * step_y:>{width}} {line}" for i, line in enumerate(lines)]
+
+    file.write("\n".join(lines) + "\n")